@@ -0,0 +1,3 @@
+from .memomix import MemoMix
+from .project_import_export import import_project, export_project
+from .shared_history_index import SharedHistoryIndex
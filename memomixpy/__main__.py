@@ -0,0 +1,97 @@
+import argparse
+import json
+import sys
+
+from .project_import_export import import_project, import_entry, export_entry
+
+# Command-line batch tool: reads the JSON objects of projects from files or from the standard input
+# (a single object, an array of objects or JSON Lines) and writes one JSON line per project:
+# - generate: {"entry": {...}}, the next entry of the project,
+# - plan: {"entries": [{...}, ...]}, the next entries of the project, each one being saved before the next,
+# - score: {"redundancy": ..., "lowerBound": ..., "gap": ...}, the scores of the entry of the key 'entry'.
+# A project that fails gets {"error": "..."} instead, and the exit status is 1.
+
+def read_project_objects(source):
+    """
+    Read the JSON objects of the projects of a source.
+
+    :param source: the file object to read
+    :return: the list of project objects
+    """
+    text = source.read()
+    try:
+        project_objects = json.loads(text)
+    except json.JSONDecodeError:
+        # JSON Lines
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return project_objects if isinstance(project_objects, list) else [project_objects]
+
+def run_command(command: str, project_object: dict, args):
+    """
+    Run a command on a project.
+
+    :param command: the name of the command
+    :param project_object: the project object
+    :param args: the parsed arguments
+    :return: the result object
+    """
+    mm = import_project(
+        project_object, approximation_width=args.approximation_width, prioritize_groups=args.prioritize_groups
+    )
+    if command == 'generate':
+        return {'entry': export_entry(generate_entry(mm, args.attempts))}
+    if command == 'plan':
+        entries = []
+        for _ in range(args.rounds):
+            entry = generate_entry(mm, args.attempts)
+            mm.save_entry(entry)
+            entries.append(export_entry(entry))
+        return {'entries': entries}
+    entry = import_entry(project_object['entry'])
+    redundancy = mm.get_entry_redundancy(entry)
+    lower_bound = mm.get_redundancy_lower_bound()
+    return {'redundancy': redundancy, 'lowerBound': lower_bound, 'gap': redundancy - lower_bound}
+
+def generate_entry(mm, attempts: int):
+    # the entries are only exported, so they are not built as dictionaries of sets
+    if attempts > 1:
+        return mm.generate_best_entry(attempts, compact=True)
+    return mm.generate_entry(compact=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m memomixpy', description='Generate, plan or score the entries of MemoMix projects.'
+    )
+    parser.add_argument('command', choices=['generate', 'plan', 'score'], help='what to compute for each project')
+    parser.add_argument('files', nargs='*', default=['-'], help='the project files (the standard input if none or -)')
+    parser.add_argument('--attempts', type=int, default=1, help='number of entries generated to keep the best one')
+    parser.add_argument('--rounds', type=int, default=1, help='number of entries planned by the plan command')
+    parser.add_argument('--approximation-width', type=int, help='width of the approximate generation')
+    parser.add_argument('--prioritize-groups', action='store_true', help='avoid repeated person-group pairings')
+    parser.add_argument('--seed', type=int, help='seed of the random generator')
+    # intermixed, so that the options can come before the files
+    args = parser.parse_intermixed_args(argv)
+    assert args.attempts >= 1, 'The number of attempts is negative or null.'
+    assert args.rounds >= 1, 'The number of rounds is negative or null.'
+
+    if args.seed is not None:
+        import random
+        random.seed(args.seed)
+    failed = False
+    for file_name in args.files:
+        if file_name == '-':
+            project_objects = read_project_objects(sys.stdin)
+        else:
+            with open(file_name, encoding='utf-8') as file:
+                project_objects = read_project_objects(file)
+        for project_object in project_objects:
+            try:
+                result = run_command(args.command, project_object, args)
+            except Exception as exception:
+                result = {'error': f'{type(exception).__name__}: {exception}'}
+                failed = True
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
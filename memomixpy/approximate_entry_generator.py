@@ -0,0 +1,198 @@
+import random
+
+from .entry_generator import EntryGenerator
+from .history_index import HistoryIndex
+from .util import random_shuffle, random_choice
+
+class PartnerCandidates:
+    """
+    For each person, a small sampled list of candidate partners among the least met ones.
+    The lists are built lazily and refreshed incrementally after each saved entry.
+    """
+    def __init__(self, history_index: HistoryIndex, width: int):
+        """
+        Constructor.
+
+        :param history_index: the index of the past pairings
+        :param width: the number of candidate partners of each person
+        """
+        self.history_index = history_index
+        self.width = width
+        # person ID -> list of candidate partner IDs
+        self.candidates = {}
+
+    def copy(self, history_index: HistoryIndex):
+        """
+        Get a copy of the candidate partners, reading the counts from another history index.
+
+        :param history_index: the index of the past pairings of the copy
+        :return: the copy
+        """
+        partner_candidates = PartnerCandidates(history_index, self.width)
+        partner_candidates.candidates = dict(self.candidates)
+        return partner_candidates
+
+    def get_candidates(self, person_id: str, person_id_list: list):
+        """
+        Get the candidate partners of a person, building them if needed.
+
+        :param person_id: the ID of the person
+        :param person_id_list: the list of IDs of the persons of the roster
+        :return: the list of candidate partner IDs
+        """
+        if person_id not in self.candidates:
+            self.candidates[person_id] = self.sample_candidates(person_id, person_id_list, [])
+        return self.candidates[person_id]
+
+    def refresh(self, entry: dict, person_id_list: list):
+        """
+        Replace the candidate partners that were met in a new entry.
+
+        :param entry: the new entry
+        :param person_id_list: the list of IDs of the persons of the roster
+        """
+        for group in entry.values():
+            for person_id in group:
+                if person_id in self.candidates:
+                    kept_candidates = [
+                        partner_id for partner_id in self.candidates[person_id]
+                        if partner_id not in group
+                    ]
+                    if len(kept_candidates) < self.width:
+                        kept_candidates = self.sample_candidates(person_id, person_id_list, kept_candidates)
+                    self.candidates[person_id] = kept_candidates
+
+    def sample_candidates(self, person_id: str, person_id_list: list, kept_candidates: list):
+        """
+        Top up a list of candidate partners with the least met persons of a random sample.
+
+        :param person_id: the ID of the person
+        :param person_id_list: the list of IDs of the persons of the roster
+        :param kept_candidates: the candidates to keep
+        :return: the new list of candidate partner IDs
+        """
+        sample_size = min(2 * self.width, len(person_id_list))
+        sampled_ids = set(random.sample(person_id_list, sample_size)) - {person_id} - set(kept_candidates)
+        sorted_sampled_ids = sorted(
+            random_shuffle(sampled_ids),
+            key=lambda partner_id: self.history_index.get_person_count(person_id, partner_id)
+        )
+        return kept_candidates + sorted_sampled_ids[:self.width - len(kept_candidates)]
+
+class SampledIndexPool:
+    """
+    Set of indices supporting removal and random sampling in constant time.
+    """
+    def __init__(self, indices):
+        self.indices = list(indices)
+        self.positions = {index: position for position, index in enumerate(self.indices)}
+
+    def __len__(self):
+        return len(self.indices)
+
+    def remove(self, index: int):
+        position = self.positions.pop(index, None)
+        if position is not None:
+            last_index = self.indices.pop()
+            if last_index != index:
+                self.indices[position] = last_index
+                self.positions[last_index] = position
+
+    def sample(self, count: int):
+        if len(self.indices) <= count:
+            return set(self.indices)
+        return set(random.sample(self.indices, count))
+
+class SparseCountsRow:
+    """
+    Row of a count table, looked up lazily in the history index.
+    """
+    def __init__(self, get_count, key_id: str, id_list: list):
+        self.get_count = get_count
+        self.key_id = key_id
+        self.id_list = id_list
+
+    def __getitem__(self, idx: int):
+        return self.get_count(self.key_id, self.id_list[idx])
+
+class ApproximateEntryGenerator(EntryGenerator):
+    """
+    Entry generator for huge rosters: instead of all the person pairs and all the groups,
+    only the candidate partners of each person and a bounded sample of groups are considered,
+    and the counts are looked up lazily in the history index instead of being tabulated.
+    The width trades quality for speed.
+    """
+    def __init__(
+        self, person_ids: set, group_sizes: dict, history_index: HistoryIndex,
+        partner_candidates: PartnerCandidates, constraints: list, width: int
+    ):
+        self.history_index = history_index
+        self.partner_candidates = partner_candidates
+        self.width = width
+        super().__init__(
+            person_ids=person_ids, group_sizes=group_sizes,
+            pairing_counts_map=None, person_occurrences_map=None, group_occurrences_map=None,
+            constraints=constraints
+        )
+        # the groups that are not full, and the groups that are empty
+        self.open_group_pool = SampledIndexPool(range(len(self.group_id_list)))
+        self.empty_group_pool = SampledIndexPool(range(len(self.group_id_list)))
+
+    def get_count_tables(self):
+        pairing_counts = [self.history_index.get_pairing_count(person_id) for person_id in self.person_id_list]
+        person_counts = [
+            SparseCountsRow(self.history_index.get_person_count, person_id, self.person_id_list)
+            for person_id in self.person_id_list
+        ]
+        group_counts = [
+            SparseCountsRow(self.history_index.get_group_count, person_id, self.group_id_list)
+            for person_id in self.person_id_list
+        ]
+        return pairing_counts, person_counts, group_counts
+
+    def insert_couples_with_least_occurrences(self):
+        # only the couples of each person with its candidate partners are considered
+        couples = set()
+        for idx, person_id in enumerate(self.person_id_list):
+            for partner_id in self.partner_candidates.get_candidates(person_id, self.person_id_list):
+                partner_idx = self.person_indices.get(partner_id)
+                if partner_idx is not None and partner_idx != idx:
+                    couples.add((min(idx, partner_idx), max(idx, partner_idx)))
+        sorted_couples = sorted(
+            random_shuffle(couples),
+            key=lambda couple: (
+                self.person_counts[couple[0]][couple[1]],
+                min(self.pairing_counts[couple[0]], self.pairing_counts[couple[1]])
+            )
+        )
+
+        # insert in empty groups couples of persons who have been the least frequently together
+        for idx1, idx2 in sorted_couples:
+            if self.remaining_bitset.bit_count() < 2 or not self.empty_group_pool:
+                return
+            couple_bitset = 1 << idx1 | 1 << idx2
+            # if the two persons have not been already inserted
+            if self.remaining_bitset & couple_bitset == couple_bitset:
+                best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                    person_indices=[idx1, idx2], candidate_group_indices=self.empty_group_pool.sample(self.width)
+                )
+                if best_group_indices:
+                    self.insert_persons([idx1, idx2], random_choice(best_group_indices))
+
+    def insert_persons(self, person_indices: list, group_idx: int):
+        super().insert_persons(person_indices, group_idx)
+        self.empty_group_pool.remove(group_idx)
+        if self.get_group_length(group_idx) >= self.capacities[group_idx]:
+            self.open_group_pool.remove(group_idx)
+
+    def get_best_group_indices_by_person_occurrences(self, person_indices: list, candidate_group_indices=None):
+        # instead of all the groups, only a bounded sample of groups that are not full are candidates
+        if candidate_group_indices is None:
+            candidate_group_indices = self.open_group_pool.sample(self.width)
+        return super().get_best_group_indices_by_person_occurrences(person_indices, candidate_group_indices)
+
+    def get_best_group_indices_by_group_occurrences(self, person_indices: list, candidate_group_indices=None):
+        # instead of all the groups, only a bounded sample of groups that are not full are candidates
+        if candidate_group_indices is None:
+            candidate_group_indices = self.open_group_pool.sample(self.width)
+        return super().get_best_group_indices_by_group_occurrences(person_indices, candidate_group_indices)
@@ -0,0 +1,259 @@
+from .util import random_shuffle
+
+class AssignmentEntryGenerator:
+    """
+    Entry generator for rotations (chores, table duties...) where avoiding repeated person-group pairings
+    matters more than who is with whom: the persons are assigned to the seats of the groups in one shot,
+    by solving optimally the assignment problem whose costs are the past person-group pairings.
+    The persons of the 'together' and 'apart' constraints are seated first, since these constraints
+    link persons and cannot be expressed as costs of the assignment of single persons.
+    """
+    def __init__(self, person_ids: set, group_sizes: dict, group_occurrences_map: dict, constraints: list):
+        self.person_ids = person_ids
+        self.group_sizes = group_sizes
+        self.group_occurrences_map = group_occurrences_map
+        self.constraints = constraints
+
+        # person ID -> set of allowed group IDs, for the persons with mandatory or forbidden groups
+        self.allowed_group_ids = self.get_allowed_group_ids()
+        # the counts of past person-group pairings
+        self.counts = {}
+        for group_occurrence in self.group_occurrences_map.values():
+            self.counts[group_occurrence['personId'], group_occurrence['groupId']] = group_occurrence['count']
+        # person ID -> set of IDs of the persons to keep apart from
+        self.apart_person_ids = {}
+        for constraint in self.constraints:
+            if constraint['type'] == 'apart':
+                for person_id in constraint['persons']:
+                    self.apart_person_ids.setdefault(person_id, set()).update(constraint['persons'] - {person_id})
+        # the new entry, and the ID of the group of each seated person
+        self.entry = {group_id: set() for group_id in self.group_sizes}
+        self.person_group_ids = {}
+
+    def generate_entry(self):
+        """
+        Generate a new possible entry that satisfies the constraints, minimizes the redundancy
+        of past person-group pairings, and then spreads the persons as evenly as possible over the groups.
+
+        :return: a new entry
+        """
+        # the persons linked by 'together' constraints are seated in a single group,
+        # the blocks with the fewest allowed groups first, then the largest ones
+        blocks = sorted(
+            self.get_together_blocks(),
+            key=lambda person_ids: (len(self.get_block_allowed_group_ids(person_ids)), -len(person_ids))
+        )
+        for person_ids in blocks:
+            self.seat_together_persons(person_ids)
+        # the persons of each 'apart' constraint are seated in distinct groups
+        for constraint in self.constraints:
+            if constraint['type'] == 'apart':
+                self.seat_apart_persons(constraint['persons'])
+        # the other persons take the remaining seats
+        self.seat_persons([
+            person_id for person_id in random_shuffle(self.person_ids) if person_id not in self.person_group_ids
+        ])
+        return self.entry
+
+    def get_allowed_group_ids(self):
+        """
+        Get the groups allowed for each person by the mandatory and forbidden groups of the constraints.
+
+        :return: the dictionary giving for each constrained person the set of allowed group IDs
+        """
+        allowed_group_ids = {}
+        for constraint in self.constraints:
+            if constraint['type'] != 'together':
+                continue
+            mandatory_group_id = constraint.get('mandatoryGroup')
+            forbidden_group_ids = constraint.get('forbiddenGroups') or set()
+            for person_id in constraint['persons']:
+                group_ids = allowed_group_ids.get(person_id, set(self.group_sizes))
+                if mandatory_group_id:
+                    group_ids = group_ids & {mandatory_group_id}
+                allowed_group_ids[person_id] = group_ids - set(forbidden_group_ids)
+        return allowed_group_ids
+
+    def get_together_blocks(self):
+        """
+        Get the sets of persons linked by a chain of 'together' constraints.
+
+        :return: the list of the sets of at least 2 person IDs
+        """
+        block_indices = {}
+        blocks = []
+        for constraint in self.constraints:
+            if constraint['type'] != 'together':
+                continue
+            # merge the blocks of the persons of the constraint
+            block = set(constraint['persons'])
+            for idx in {block_indices[person_id] for person_id in block if person_id in block_indices}:
+                block |= blocks[idx]
+                blocks[idx] = set()
+            blocks.append(block)
+            for person_id in block:
+                block_indices[person_id] = len(blocks) - 1
+        return [block for block in random_shuffle(blocks) if len(block) >= 2]
+
+    def get_block_allowed_group_ids(self, person_ids: set):
+        """
+        Get the groups allowed for all the persons of a block.
+
+        :param person_ids: the set of IDs of the persons of the block
+        :return: the set of allowed group IDs
+        """
+        allowed_group_ids = set(self.group_sizes)
+        for person_id in person_ids:
+            allowed_group_ids &= self.allowed_group_ids.get(person_id, allowed_group_ids)
+        return allowed_group_ids
+
+    def get_free_seat_count(self, group_id: str):
+        return self.group_sizes[group_id] - len(self.entry[group_id])
+
+    def seat(self, person_id: str, group_id: str):
+        self.entry[group_id].add(person_id)
+        self.person_group_ids[person_id] = group_id
+
+    def seat_together_persons(self, person_ids: set):
+        """
+        Seat persons in the allowed group with enough free seats that minimizes first the 'apart' conflicts,
+        then the past person-group pairings, then the number of persons already seated.
+        If there is no such group, the persons are left to the assignment of the remaining seats.
+
+        :param person_ids: the set of IDs of the persons to seat together
+        """
+        candidate_group_ids = [
+            group_id for group_id in random_shuffle(self.get_block_allowed_group_ids(person_ids))
+            if self.get_free_seat_count(group_id) >= len(person_ids)
+        ]
+        if not candidate_group_ids:
+            return
+        group_id = min(candidate_group_ids, key=lambda group_id: (
+            sum(len(self.apart_person_ids.get(person_id, set()) & self.entry[group_id]) for person_id in person_ids),
+            sum(self.counts.get((person_id, group_id), 0) for person_id in person_ids),
+            len(self.entry[group_id])
+        ))
+        for person_id in person_ids:
+            self.seat(person_id, group_id)
+
+    def seat_apart_persons(self, person_ids: set):
+        """
+        Seat the persons of an 'apart' constraint that are not seated yet in distinct groups,
+        avoiding the groups of the persons they must be kept apart from, by solving the assignment
+        of the persons to the groups.
+        The persons who cannot get a distinct group are left to the assignment of the remaining seats.
+
+        :param person_ids: the set of IDs of the persons to keep apart
+        """
+        group_ids = [group_id for group_id in self.group_sizes if self.get_free_seat_count(group_id)]
+        person_id_list = [
+            person_id for person_id in random_shuffle(person_ids) if person_id not in self.person_group_ids
+        ][:len(group_ids)]
+        if not person_id_list:
+            return
+        group_weight = max(self.group_sizes.values()) + 1
+        costs = [
+            [
+                self.counts.get((person_id, group_id), 0) * group_weight + len(self.entry[group_id])
+                if group_id in self.allowed_group_ids.get(person_id, self.group_sizes)
+                and not self.apart_person_ids[person_id] & self.entry[group_id] else None
+                for group_id in group_ids
+            ]
+            for person_id in person_id_list
+        ]
+        for person_id, group_idx in zip(person_id_list, solve_assignment(self.get_forbidden_costs(costs))):
+            self.seat(person_id, group_ids[group_idx])
+
+    def seat_persons(self, person_id_list: list):
+        """
+        Seat persons in the remaining seats by solving the assignment of the persons to the seats.
+
+        :param person_id_list: the list of IDs of the persons to seat
+        """
+        # the free seats of the groups, the k-th seat of a group being taken before its (k+1)-th one
+        seats = [
+            (group_id, seat_idx)
+            for group_id, size in self.group_sizes.items()
+            for seat_idx in range(len(self.entry[group_id]), size)
+        ]
+        # the weight of the person-group pairings, so that they always prevail over the seat ranks
+        group_weight = len(seats) * max(self.group_sizes.values()) + 1
+        costs = [
+            [
+                self.counts.get((person_id, group_id), 0) * group_weight + seat_idx
+                if group_id in self.allowed_group_ids.get(person_id, self.group_sizes)
+                and not self.apart_person_ids.get(person_id, set()) & self.entry[group_id] else None
+                for group_id, seat_idx in seats
+            ]
+            for person_id in person_id_list
+        ]
+        for person_id, seat_idx in zip(person_id_list, solve_assignment(self.get_forbidden_costs(costs))):
+            self.seat(person_id, seats[seat_idx][0])
+
+    def get_forbidden_costs(self, costs: list):
+        """
+        Replace the costs of the forbidden cells by a cost that exceeds any assignment of allowed cells,
+        so that they are only taken if the constraints cannot be satisfied.
+
+        :param costs: the cost matrix, with None for the forbidden cells
+        :return: the cost matrix
+        """
+        max_cost = max((cost for row in costs for cost in row if cost is not None), default=0)
+        forbidden_cost = (max_cost + 1) * len(costs) + 1
+        return [[forbidden_cost if cost is None else cost for cost in row] for row in costs]
+
+def solve_assignment(costs: list):
+    """
+    Solve the rectangular assignment problem with the Hungarian algorithm (in O(n^2 * m)):
+    assign each row to a distinct column so that the sum of the costs is minimal.
+
+    :param costs: the cost matrix, with no more rows than columns
+    :return: the list giving the index of the column assigned to each row
+    """
+    row_count = len(costs)
+    column_count = len(costs[0]) if costs else 0
+    assert row_count <= column_count, 'There are more rows than columns.'
+    # potentials of the rows and columns, and row matched with each column (1-indexed, 0 for none)
+    row_potentials = [0] * (row_count + 1)
+    column_potentials = [0] * (column_count + 1)
+    column_rows = [0] * (column_count + 1)
+    previous_columns = [0] * (column_count + 1)
+    for row in range(1, row_count + 1):
+        # find an augmenting path from the new row with Dijkstra on the reduced costs
+        column_rows[0] = row
+        column = 0
+        min_reduced_costs = [float('inf')] * (column_count + 1)
+        used = [False] * (column_count + 1)
+        while column_rows[column]:
+            used[column] = True
+            current_row = column_rows[column]
+            row_costs = costs[current_row - 1]
+            row_potential = row_potentials[current_row]
+            delta = float('inf')
+            next_column = 0
+            for other_column in range(1, column_count + 1):
+                if not used[other_column]:
+                    reduced_cost = row_costs[other_column - 1] - row_potential - column_potentials[other_column]
+                    if reduced_cost < min_reduced_costs[other_column]:
+                        min_reduced_costs[other_column] = reduced_cost
+                        previous_columns[other_column] = column
+                    if min_reduced_costs[other_column] < delta:
+                        delta = min_reduced_costs[other_column]
+                        next_column = other_column
+            for other_column in range(column_count + 1):
+                if used[other_column]:
+                    row_potentials[column_rows[other_column]] += delta
+                    column_potentials[other_column] -= delta
+                else:
+                    min_reduced_costs[other_column] -= delta
+            column = next_column
+        # augment the matching along the path
+        while column:
+            previous_column = previous_columns[column]
+            column_rows[column] = column_rows[previous_column]
+            column = previous_column
+    assignment = [None] * row_count
+    for column in range(1, column_count + 1):
+        if column_rows[column]:
+            assignment[column_rows[column] - 1] = column - 1
+    return assignment
@@ -0,0 +1,46 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .project_import_export import import_project
+
+def generate_entries(project_objects: list, max_workers: int=None, chunk_size: int=None):
+    """
+    Generate a new entry for each of many independent projects, using a pool of processes.
+    The projects are packed into chunks, so that each task of the pool generates several entries.
+
+    :param project_objects: the list of JSON objects of the projects
+    :param max_workers: the number of processes (the number of CPUs if None)
+    :param chunk_size: the number of projects per task (derived from the number of projects and processes if None)
+    :return: the list of the new entries in the order of the projects,
+    with the exception raised in place of the entry for the projects that failed
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if chunk_size is None:
+        # a few chunks per process to balance the load without paying a task per project
+        chunk_size = max(1, math.ceil(len(project_objects) / (4 * max_workers)))
+    chunks = [
+        project_objects[idx:idx + chunk_size]
+        for idx in range(0, len(project_objects), chunk_size)
+    ]
+    # no need to pay for a pool if there is a single chunk or process
+    if len(chunks) <= 1 or max_workers == 1:
+        return [entry for chunk in chunks for entry in generate_chunk_entries(chunk)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [entry for entries in executor.map(generate_chunk_entries, chunks) for entry in entries]
+
+def generate_chunk_entries(project_objects: list):
+    """
+    Generate a new entry for each project of a chunk, isolating the errors of each project.
+
+    :param project_objects: the list of JSON objects of the projects
+    :return: the list of the new entries, or of the raised exceptions
+    """
+    entries = []
+    for project_object in project_objects:
+        try:
+            entries.append(import_project(project_object).generate_entry())
+        except Exception as exception:
+            entries.append(exception)
+    return entries
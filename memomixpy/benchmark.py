@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from .approximate_entry_generator import ApproximateEntryGenerator, PartnerCandidates
+from .memomix import MemoMix
+
+# Quality-versus-time benchmark: on small synthetic instances, the optimal redundancy
+# is computed exhaustively and compared with the redundancy reached by each method.
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+
+# the iteration order of the sets of IDs depends on the hash seed, so it is pinned for the runs to be reproducible
+HASH_SEED = '0'
+
+# name -> function generating an entry from a MemoMix instance
+METHODS = {
+    'greedy': lambda mm: mm.generate_entry(),
+    'best-of-4': lambda mm: mm.generate_best_entry(attempts=4),
+    'best-of-16': lambda mm: mm.generate_best_entry(attempts=16),
+    'best-of-64': lambda mm: mm.generate_best_entry(attempts=64),
+    'approximate-4': lambda mm: ApproximateEntryGenerator(
+        person_ids=mm.person_ids, group_sizes=mm.group_sizes, history_index=mm.history_index,
+        partner_candidates=PartnerCandidates(mm.history_index, width=4), constraints=mm.constraints, width=4
+    ).generate_entry(),
+}
+
+# (number of persons, group capacities) of the synthetic instances
+SHAPES = [
+    (6, [3, 3]),
+    (8, [4, 4]),
+    (8, [3, 3, 2]),
+    (9, [3, 3, 3]),
+    (10, [4, 3, 3]),
+]
+
+def generate_instances(count: int, seed: int):
+    """
+    Generate synthetic instances with a random history.
+
+    :param count: the number of instances to generate
+    :param seed: the seed of the random generator
+    :return: the list of (persons, group sizes, history) tuples
+    """
+    rng = random.Random(seed)
+    instances = []
+    for index in range(count):
+        person_count, capacities = SHAPES[index % len(SHAPES)]
+        person_ids = [f'p{idx}' for idx in range(person_count)]
+        group_sizes = {f'g{idx}': size for idx, size in enumerate(capacities)}
+        history = []
+        for _ in range(rng.randint(1, 6)):
+            shuffled_person_ids = rng.sample(person_ids, len(person_ids))
+            entry = {}
+            for group_id, size in group_sizes.items():
+                entry[group_id] = set(shuffled_person_ids[:size])
+                shuffled_person_ids = shuffled_person_ids[size:]
+            history.append(entry)
+        instances.append((set(person_ids), group_sizes, history))
+    return instances
+
+def get_optimal_redundancy(mm: MemoMix):
+    """
+    Compute exhaustively the lowest redundancy reachable by an entry, using branch and bound.
+
+    :param mm: the MemoMix instance
+    :return: the optimal redundancy
+    """
+    person_ids = sorted(mm.person_ids)
+    group_ids = list(mm.group_sizes)
+    person_occurrences_map = mm.get_occurrences_maps()[1]
+    counts = [[0] * len(person_ids) for _ in person_ids]
+    for person_occurrence in person_occurrences_map.values():
+        idx1 = person_ids.index(person_occurrence['person1Id'])
+        idx2 = person_ids.index(person_occurrence['person2Id'])
+        counts[idx1][idx2] = counts[idx2][idx1] = person_occurrence['count']
+    groups = [[] for _ in group_ids]
+    best = [float('inf')]
+
+    def place(idx: int, redundancy: int):
+        if redundancy >= best[0]:
+            return
+        if idx == len(person_ids):
+            best[0] = redundancy
+            return
+        tried_empty_size = set()
+        for group_idx, group_id in enumerate(group_ids):
+            group = groups[group_idx]
+            size = mm.group_sizes[group_id]
+            if len(group) >= size:
+                continue
+            # empty groups of the same size are interchangeable
+            if not group:
+                if size in tried_empty_size:
+                    continue
+                tried_empty_size.add(size)
+            added_redundancy = sum(counts[idx][other_idx] for other_idx in group)
+            group.append(idx)
+            place(idx + 1, redundancy + added_redundancy)
+            group.pop()
+
+    place(0, 0)
+    return best[0]
+
+def run_benchmark(instance_count: int, seed: int, methods=None):
+    """
+    Run every method on every instance and measure its time and redundancy gap.
+    The results are only reproducible with a fixed hash seed (PYTHONHASHSEED).
+
+    :param instance_count: the number of synthetic instances
+    :param seed: the seed of the random generators
+    :param methods: the dictionary of methods to run (all of them by default)
+    :return: the list of result rows, one per method
+    """
+    if methods is None:
+        methods = METHODS
+    instances = generate_instances(instance_count, seed)
+    optima = [
+        get_optimal_redundancy(MemoMix(persons=person_ids, group_sizes=group_sizes, history=history))
+        for person_ids, group_sizes, history in instances
+    ]
+    rows = []
+    for name, method in methods.items():
+        random.seed(seed)
+        total_time = 0
+        gaps = []
+        for (person_ids, group_sizes, history), optimum in zip(instances, optima):
+            mm = MemoMix(persons=person_ids, group_sizes=group_sizes, history=history)
+            mm.get_occurrences_maps()
+            start = time.perf_counter()
+            entry = method(mm)
+            total_time += time.perf_counter() - start
+            gaps.append(mm.get_entry_redundancy(entry) - optimum)
+        rows.append({
+            'method': name,
+            'time_ms': 1000 * total_time / len(instances),
+            'mean_gap': sum(gaps) / len(gaps),
+            'max_gap': max(gaps),
+            'optimal_rate': sum(1 for gap in gaps if gap == 0) / len(gaps),
+        })
+    # a method is on the Pareto front if no faster method reaches a lower or equal gap
+    for row in rows:
+        row['pareto'] = not any(
+            other['time_ms'] < row['time_ms'] and other['mean_gap'] <= row['mean_gap']
+            for other in rows
+        )
+    return rows
+
+def get_lower_bound_stats(instance_count: int, seed: int):
+    """
+    Check the redundancy lower bounds against the exact optima and measure their tightness.
+
+    :param instance_count: the number of synthetic instances
+    :param seed: the seed of the random generators
+    :return: the mean slack between the optima and the lower bounds, and the rate of tight lower bounds
+    """
+    slacks = []
+    for person_ids, group_sizes, history in generate_instances(instance_count, seed):
+        mm = MemoMix(persons=person_ids, group_sizes=group_sizes, history=history)
+        optimum = get_optimal_redundancy(mm)
+        lower_bound = mm.get_redundancy_lower_bound()
+        assert lower_bound <= optimum, f'The lower bound {lower_bound} exceeds the optimum {optimum}.'
+        slacks.append(optimum - lower_bound)
+    return sum(slacks) / len(slacks), sum(1 for slack in slacks if slack == 0) / len(slacks)
+
+def check_baselines(rows: list, baselines: dict, tolerance: float):
+    """
+    Get the methods whose mean redundancy gap degraded compared with the stored baselines.
+
+    :param rows: the result rows
+    :param baselines: the dictionary of baseline mean gaps by method
+    :param tolerance: the absolute tolerance on the mean gap
+    :return: the list of (method, mean gap, baseline) tuples of the degraded methods
+    """
+    regressions = []
+    for row in rows:
+        baseline = baselines.get(row['method'])
+        if baseline is not None and row['mean_gap'] > baseline + tolerance:
+            regressions.append((row['method'], row['mean_gap'], baseline))
+    return regressions
+
+def print_table(rows: list):
+    print(f"{'method':<16}{'time (ms)':>12}{'mean gap':>12}{'max gap':>10}{'optimal':>10}  pareto")
+    for row in sorted(rows, key=lambda row: row['time_ms']):
+        print(
+            f"{row['method']:<16}{row['time_ms']:>12.3f}{row['mean_gap']:>12.3f}"
+            f"{row['max_gap']:>10}{row['optimal_rate']:>10.0%}  {'*' if row['pareto'] else ''}"
+        )
+
+if __name__ == '__main__':
+    if os.environ.get('PYTHONHASHSEED') != HASH_SEED:
+        # run again in a process with the pinned hash seed
+        env = {**os.environ, 'PYTHONHASHSEED': HASH_SEED}
+        sys.exit(subprocess.call([sys.executable, '-m', __spec__.name, *sys.argv[1:]], env=env))
+
+    parser = argparse.ArgumentParser(description='Quality-versus-time benchmark against exact optima.')
+    parser.add_argument('--instances', type=int, default=200, help='number of synthetic instances')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generators')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='tolerance on the mean gap')
+    parser.add_argument('--update', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.instances, args.seed)
+    print_table(rows)
+    mean_slack, tight_rate = get_lower_bound_stats(args.instances, args.seed)
+    print(f'Lower bound: mean slack of {mean_slack:.3f}, tight on {tight_rate:.0%} of the instances.')
+    if args.update:
+        with open(BASELINES_PATH, 'w') as file:
+            json.dump({row['method']: round(row['mean_gap'], 3) for row in rows}, file, indent=4)
+            file.write('\n')
+    elif os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as file:
+            regressions = check_baselines(rows, json.load(file), args.tolerance)
+        for method, mean_gap, baseline in regressions:
+            print(f"Regression: '{method}' has a mean gap of {mean_gap:.3f} (baseline {baseline:.3f}).")
+        if regressions:
+            sys.exit(1)
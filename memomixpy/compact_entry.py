@@ -0,0 +1,181 @@
+from collections.abc import Mapping, Set
+
+class CompactEntry(Mapping):
+    """
+    Entry stored as flat arrays instead of a dictionary of sets:
+    - the index of the group of each person,
+    - the indices of the persons sorted by group, the persons of the k-th group
+    being between the k-th and the (k+1)-th group offsets.
+    It is read-only and can be used wherever an entry is expected, without allocating a set per group:
+    the groups are set views computed on the fly, and are iterated as lists by values() and items().
+    """
+    def __init__(
+        self, person_id_list: list, group_id_list: list, person_group_indices: list,
+        member_indices: list, group_offsets: list
+    ):
+        """
+        Constructor.
+
+        :param person_id_list: the list of person IDs
+        :param group_id_list: the list of group IDs
+        :param person_group_indices: the index of the group of each person
+        :param member_indices: the indices of the persons sorted by group
+        :param group_offsets: the offset of the persons of each group in the member indices,
+        followed by the number of persons
+        """
+        self.person_id_list = person_id_list
+        self.group_id_list = group_id_list
+        self.person_group_indices = person_group_indices
+        self.member_indices = member_indices
+        self.group_offsets = group_offsets
+        # the indices of the IDs, built lazily for the lookups
+        self.person_indices = None
+        self.group_indices = None
+
+    @staticmethod
+    def from_group_members(person_id_list: list, group_id_list: list, group_member_indices: list):
+        """
+        Build a compact entry from the indices of the persons of each group.
+
+        :param person_id_list: the list of person IDs
+        :param group_id_list: the list of group IDs
+        :param group_member_indices: the list of the person indices of each group
+        :return: the compact entry
+        """
+        person_group_indices = [None] * len(person_id_list)
+        member_indices = []
+        group_offsets = [0]
+        for group_idx, person_indices in enumerate(group_member_indices):
+            for idx in person_indices:
+                person_group_indices[idx] = group_idx
+            member_indices.extend(person_indices)
+            group_offsets.append(len(member_indices))
+        return CompactEntry(person_id_list, group_id_list, person_group_indices, member_indices, group_offsets)
+
+    @staticmethod
+    def from_entry(entry: dict):
+        """
+        Build a compact entry from an entry.
+
+        :param entry: the dictionary giving for each group ID the set of person IDs
+        :return: the compact entry
+        """
+        if isinstance(entry, CompactEntry):
+            return entry
+        person_id_list = [person_id for group in entry.values() for person_id in group]
+        group_member_indices = []
+        offset = 0
+        for group in entry.values():
+            group_member_indices.append(range(offset, offset + len(group)))
+            offset += len(group)
+        return CompactEntry.from_group_members(person_id_list, list(entry), group_member_indices)
+
+    def __getitem__(self, group_id: str):
+        if self.group_indices is None:
+            self.group_indices = {group_id: idx for idx, group_id in enumerate(self.group_id_list)}
+        return GroupView(self, self.group_indices[group_id])
+
+    def __iter__(self):
+        return iter(self.group_id_list)
+
+    def __len__(self):
+        return len(self.group_id_list)
+
+    def __repr__(self):
+        return f'CompactEntry({self.to_dict()!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return self.to_dict() == {group_id: set(group) for group_id, group in other.items()}
+
+    def values(self):
+        # the groups are iterated as lists built in bulk, instead of set views looked up by group ID
+        return self.get_group_lists()
+
+    def items(self):
+        return list(zip(self.group_id_list, self.get_group_lists()))
+
+    def get_group_lists(self):
+        """
+        Get the persons of each group, built in bulk from the flat arrays.
+
+        :return: the list of the lists of person IDs of each group
+        """
+        member_ids = list(map(self.person_id_list.__getitem__, self.member_indices))
+        return list(map(member_ids.__getitem__, map(slice, self.group_offsets[:-1], self.group_offsets[1:])))
+
+    @staticmethod
+    def get_entry_members(entry: dict):
+        """
+        Get the persons of an entry of either shape laid out group by group, without a list per group.
+        The persons of the k-th group are between the k-th and the (k+1)-th group offsets.
+
+        :param entry: the entry, compact or not
+        :return: the list of group IDs, the list of person IDs sorted by group,
+        and the offset of the persons of each group, followed by the number of persons
+        """
+        if isinstance(entry, CompactEntry):
+            return entry.group_id_list, list(map(entry.person_id_list.__getitem__, entry.member_indices)), \
+                entry.group_offsets
+        member_ids = []
+        group_offsets = [0]
+        for group in entry.values():
+            member_ids.extend(group)
+            group_offsets.append(len(member_ids))
+        return list(entry), member_ids, group_offsets
+
+    def get_group_person_indices(self, group_idx: int):
+        """
+        Get the indices of the persons of a group.
+
+        :param group_idx: the index of the group
+        :return: the list of person indices
+        """
+        return self.member_indices[self.group_offsets[group_idx]:self.group_offsets[group_idx + 1]]
+
+    def get_person_group_idx(self, person_id: str):
+        """
+        Get the index of the group of a person.
+
+        :param person_id: the ID of the person
+        :return: the index of the group, or None if the person is not in the entry
+        """
+        if self.person_indices is None:
+            self.person_indices = {person_id: idx for idx, person_id in enumerate(self.person_id_list)}
+        idx = self.person_indices.get(person_id)
+        return None if idx is None else self.person_group_indices[idx]
+
+    def to_dict(self):
+        """
+        Convert the compact entry to the dictionary of sets shape.
+
+        :return: the dictionary giving for each group ID the set of person IDs
+        """
+        return {group_id: set(group) for group_id, group in self.items()}
+
+class GroupView(Set):
+    """
+    Read-only set view of the persons of a group of a compact entry.
+    """
+    def __init__(self, entry: CompactEntry, group_idx: int):
+        self.entry = entry
+        self.group_idx = group_idx
+
+    def __contains__(self, person_id):
+        return self.entry.get_person_group_idx(person_id) == self.group_idx
+
+    def __iter__(self):
+        return map(self.entry.person_id_list.__getitem__, self.entry.get_group_person_indices(self.group_idx))
+
+    def __len__(self):
+        offsets = self.entry.group_offsets
+        return offsets[self.group_idx + 1] - offsets[self.group_idx]
+
+    def __repr__(self):
+        return repr(set(self))
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # the results of the set operations are plain sets, since they are not groups of the entry
+        return set(iterable)
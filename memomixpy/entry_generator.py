@@ -1,4 +1,7 @@
-from util import get_person_person_key, get_person_group_key, random_shuffle, random_choice
+import heapq
+
+from .compact_entry import CompactEntry
+from .util import random_shuffle, random_choice, get_bitset, get_bit_indices
 
 class EntryGenerator:
     def __init__(
@@ -13,311 +16,395 @@ class EntryGenerator:
         self.group_occurrences_map = group_occurrences_map
         self.constraints = constraints
 
-        self.remaining_person_ids = self.person_ids.copy()
-        self.entry = {}
-        # initialize the new entry with empty sets
-        for group_id in self.group_sizes:
-            self.entry[group_id] = set()
-    
-    def generate_entry(self):
+        # intern the persons and groups as integer indices
+        self.person_id_list = list(self.person_ids)
+        self.person_indices = {person_id: idx for idx, person_id in enumerate(self.person_id_list)}
+        self.group_id_list = list(self.group_sizes)
+        self.group_indices = {group_id: idx for idx, group_id in enumerate(self.group_id_list)}
+        self.capacities = [self.group_sizes[group_id] for group_id in self.group_id_list]
+        self.all_group_indices = set(range(len(self.group_id_list)))
+
+        # the counts of past pairings, indexed by person and group indices
+        self.pairing_counts, self.person_counts, self.group_counts = self.get_count_tables()
+
+        # the members of each group of the new entry and the persons not inserted yet, as bitsets
+        self.group_bitsets = [0] * len(self.group_id_list)
+        self.remaining_bitset = (1 << len(self.person_id_list)) - 1
+        # the index of the group of each person, or None if the person is not inserted yet
+        self.person_group_indices = [None] * len(self.person_id_list)
+
+    def get_count_tables(self):
+        """
+        Get the tables of past pairings indexed by person and group indices:
+        - the list of the counts of past pairings of each person with other persons,
+        - the table of the counts of past person-person pairings,
+        - the table of the counts of past person-group pairings.
+
+        :return: the 3 tables
+        """
+        pairing_counts = [self.pairing_counts_map[person_id] for person_id in self.person_id_list]
+        person_counts = [[0] * len(self.person_id_list) for _ in self.person_id_list]
+        for person_occurrence in self.person_occurrences_map.values():
+            idx1 = self.person_indices[person_occurrence['person1Id']]
+            idx2 = self.person_indices[person_occurrence['person2Id']]
+            person_counts[idx1][idx2] = person_counts[idx2][idx1] = person_occurrence['count']
+        group_counts = [[0] * len(self.group_id_list) for _ in self.person_id_list]
+        for group_occurrence in self.group_occurrences_map.values():
+            idx = self.person_indices[group_occurrence['personId']]
+            group_idx = self.group_indices[group_occurrence['groupId']]
+            group_counts[idx][group_idx] = group_occurrence['count']
+        return pairing_counts, person_counts, group_counts
+
+    def generate_entry(self, compact: bool=False):
         """
         Generate a new possible entry that satisfies the constraints
         and minimizes the redundancy of past pairings.
 
+        :param compact: whether to return a compact entry instead of a dictionary of sets
         :return: a new entry
         """
+        # the consecutive 'apart' constraints are satisfied jointly, at the position of the last one of the run
+        apart_person_indices_list = []
         # satisfy the constraints according to their priority (i.e. index in the list)
-        for constraint in self.constraints:
+        for constraint_idx, constraint in enumerate(self.constraints):
             constraint_type = constraint['type']
-            person_ids = constraint['persons']
+            person_indices = [self.person_indices[person_id] for person_id in constraint['persons']]
             if constraint_type == 'apart':
-                self.satisfy_apart_constraint(person_ids=person_ids)
+                apart_person_indices_list.append(person_indices)
+                next_constraint_idx = constraint_idx + 1
+                if next_constraint_idx == len(self.constraints) \
+                        or self.constraints[next_constraint_idx]['type'] != 'apart':
+                    self.satisfy_apart_constraints(person_indices_list=apart_person_indices_list)
+                    apart_person_indices_list = []
             elif constraint_type == 'together':
+                mandatory_group_id = constraint.get('mandatoryGroup')
                 self.satisfy_together_constraint(
-                    person_ids=person_ids,
-                    mandatory_group_id=constraint.get('mandatoryGroup'),
-                    forbidden_group_ids=constraint.get('forbiddenGroups')
+                    person_indices=person_indices,
+                    mandatory_group_idx=self.group_indices[mandatory_group_id] if mandatory_group_id else None,
+                    forbidden_group_indices={
+                        self.group_indices[group_id] for group_id in constraint.get('forbiddenGroups') or set()
+                    }
                 )
         # insert couples of persons who have been the least frequently together
         self.insert_couples_with_least_occurrences()
         # if there are no more empty groups that can contain a couple
         # insert the remaining persons
         self.insert_remaining_persons()
-        return self.entry
+        if compact:
+            return self.get_compact_entry()
+        return self.get_entry()
+
+    def get_entry(self):
+        """
+        Convert the bitsets of the groups to the public entry shape.
+
+        :return: the dictionary giving for each group ID the set of person IDs
+        """
+        return {
+            group_id: {self.person_id_list[idx] for idx in get_bit_indices(self.group_bitsets[group_idx])}
+            for group_idx, group_id in enumerate(self.group_id_list)
+        }
+
+    def get_compact_entry(self):
+        """
+        Convert the bitsets of the groups to a compact entry, without building a set per group.
 
-    def satisfy_apart_constraint(self, person_ids: set):
-        sorted_person_ids = sorted(
-            random_shuffle(person_ids),
-            key=lambda person_id: self.pairing_counts_map[person_id]
+        :return: the compact entry
+        """
+        return CompactEntry.from_group_members(
+            self.person_id_list, self.group_id_list,
+            [get_bit_indices(group_bitset) for group_bitset in self.group_bitsets]
         )
-        # IDs of groups that are not full
-        candidate_group_ids = {
-            group_id for group_id, person_ids in self.entry.items()
-            if len(person_ids) < self.group_sizes[group_id]
+
+    def satisfy_apart_constraints(self, person_indices_list: list):
+        """
+        Satisfy a run of consecutive 'apart' constraints jointly, by coloring their conflict graph with the groups
+        in the DSATUR way: the next person to insert is the one whose neighbors already use the most groups
+        (then the one with the most neighbors to insert at the start), in a group that none of its neighbors uses,
+        or else in a group that the fewest of them use.
+
+        :param person_indices_list: the list of the person indices of each 'apart' constraint of the run
+        """
+        # the conflict graph, as the bitset of the neighbors of each constrained person
+        neighbor_bitsets = {}
+        for person_indices in person_indices_list:
+            constraint_bitset = get_bitset(person_indices)
+            for idx in person_indices:
+                neighbor_bitsets[idx] = neighbor_bitsets.get(idx, 0) | constraint_bitset & ~(1 << idx)
+        # the persons already inserted by previous constraints keep their group
+        remaining_person_indices = [
+            idx for idx in random_shuffle(neighbor_bitsets) if self.person_group_indices[idx] is None
+        ]
+        remaining_bitset = get_bitset(remaining_person_indices)
+        # the groups used by the neighbors of each person to insert
+        neighbor_group_indices = {
+            idx: {
+                group_idx for group_idx, group_bitset in enumerate(self.group_bitsets)
+                if group_bitset & neighbor_bitsets[idx]
+            }
+            for idx in remaining_person_indices
         }
-        for person_id in sorted_person_ids:
-            group_id = self.get_group_id(person_id)
-            # if the person is not already inserted
-            if not group_id:
-                best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                    person_ids={person_id}, candidate_group_ids=candidate_group_ids
-                )
-                group_id = random_choice(best_group_ids)
-                self.entry[group_id].add(person_id)
-                self.remaining_person_ids.remove(person_id)
-            candidate_group_ids.remove(group_id)
-            # if there are no more groups to insert the person,
-            # we cannot satisfy the constraint further
-            if not candidate_group_ids:
-                return
-    
-    def satisfy_together_constraint(self, person_ids: set, mandatory_group_id: str=None, forbidden_group_ids: set=None):
-        sorted_person_ids = sorted(
-            random_shuffle(person_ids),
-            key=lambda person_id: self.pairing_counts_map[person_id]
+        # the groups that are not full
+        open_group_indices = {
+            group_idx for group_idx in self.all_group_indices
+            if self.get_group_length(group_idx) < self.capacities[group_idx]
+        }
+        # the priority of each person to insert, the ties being broken by the random order of the persons
+        degrees = {idx: (neighbor_bitsets[idx] & remaining_bitset).bit_count() for idx in remaining_person_indices}
+        orders = {idx: order for order, idx in enumerate(remaining_person_indices)}
+
+        def get_priority(idx):
+            return -len(neighbor_group_indices[idx]), -degrees[idx], self.pairing_counts[idx], orders[idx], idx
+
+        # heap of the persons to insert by decreasing priority, the outdated priorities being skipped
+        priorities = [get_priority(idx) for idx in remaining_person_indices]
+        heapq.heapify(priorities)
+        while priorities:
+            neighbor_group_count, _, _, _, idx = heapq.heappop(priorities)
+            if not remaining_bitset >> idx & 1 or -neighbor_group_count != len(neighbor_group_indices[idx]):
+                continue
+            remaining_bitset &= ~(1 << idx)
+            candidate_group_indices = open_group_indices - neighbor_group_indices[idx]
+            # if all the groups that are not full contain neighbors, use those with the fewest ones
+            if not candidate_group_indices:
+                conflict_counts = {
+                    group_idx: (self.group_bitsets[group_idx] & neighbor_bitsets[idx]).bit_count()
+                    for group_idx in open_group_indices
+                }
+                min_conflict_count = min(conflict_counts.values())
+                candidate_group_indices = [
+                    group_idx for group_idx, conflict_count in conflict_counts.items()
+                    if conflict_count == min_conflict_count
+                ]
+            # the groups which minimize the redundancy of past person-group pairings
+            group_counts = self.group_counts[idx]
+            min_group_count = min(group_counts[group_idx] for group_idx in candidate_group_indices)
+            best_group_indices = [
+                group_idx for group_idx in candidate_group_indices if group_counts[group_idx] == min_group_count
+            ]
+            group_idx = random_choice(best_group_indices)
+            self.insert_persons([idx], group_idx)
+            if self.get_group_length(group_idx) >= self.capacities[group_idx]:
+                open_group_indices.discard(group_idx)
+            for neighbor_idx in get_bit_indices(neighbor_bitsets[idx] & remaining_bitset):
+                if group_idx not in neighbor_group_indices[neighbor_idx]:
+                    neighbor_group_indices[neighbor_idx].add(group_idx)
+                    heapq.heappush(priorities, get_priority(neighbor_idx))
+
+    def satisfy_together_constraint(
+        self, person_indices: list, mandatory_group_idx: int=None, forbidden_group_indices: set=None
+    ):
+        sorted_person_indices = sorted(
+            random_shuffle(person_indices),
+            key=lambda idx: self.pairing_counts[idx]
         )
-        already_used_group_ids = set()
-        not_inserted_person_ids = []
-        for person_id in sorted_person_ids:
-            group_id = self.get_group_id(person_id)
-            if group_id:
-                already_used_group_ids.add(group_id)
-            else:
-                not_inserted_person_ids.append(person_id)
+        constraint_bitset = get_bitset(person_indices)
+        # the groups where some of the persons of the constraint have already been inserted
+        already_used_group_indices = {
+            group_idx for group_idx, group_bitset in enumerate(self.group_bitsets)
+            if group_bitset & constraint_bitset
+        }
+        not_inserted_person_indices = [
+            idx for idx in sorted_person_indices if self.remaining_bitset >> idx & 1
+        ]
         # if there are some groups where some of the persons of the constraint have already been inserted,
         # use them in priority
-        if already_used_group_ids:
-            for person_id in not_inserted_person_ids:
-                best_group_ids = self.get_best_group_ids_by_person_occurrences(
-                    person_ids={person_id}, candidate_group_ids=already_used_group_ids
+        if already_used_group_indices:
+            for idx in not_inserted_person_indices:
+                best_group_indices = self.get_best_group_indices_by_person_occurrences(
+                    person_indices=[idx], candidate_group_indices=already_used_group_indices
                 )
                 # if there are still groups to insert the person
-                if best_group_ids:
-                    if len(best_group_ids) > 1:
-                        best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                            person_ids={person_id}, candidate_group_ids=best_group_ids
+                if best_group_indices:
+                    if len(best_group_indices) > 1:
+                        best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                            person_indices=[idx], candidate_group_indices=best_group_indices
                         )
-                    group_id = random_choice(best_group_ids)
-                    self.entry[group_id].add(person_id)
-                    self.remaining_person_ids.remove(person_id)
+                    self.insert_persons([idx], random_choice(best_group_indices))
         else:
             # if there is a mandatory group
-            if mandatory_group_id:
-                for person_id in sorted_person_ids:
+            if mandatory_group_idx is not None:
+                for idx in sorted_person_indices:
                     # if the group is not full
-                    if len(self.entry[mandatory_group_id]) < self.group_sizes[mandatory_group_id]:
-                        self.entry[mandatory_group_id].add(person_id)
-                        self.remaining_person_ids.remove(person_id)
+                    if self.get_group_length(mandatory_group_idx) < self.capacities[mandatory_group_idx]:
+                        self.insert_persons([idx], mandatory_group_idx)
             else:
-                candidate_group_ids = set(self.group_sizes.keys())
+                candidate_group_indices = set(self.all_group_indices)
                 # if there are forbidden groups
-                if forbidden_group_ids:
-                    candidate_group_ids -= forbidden_group_ids
-                best_group_ids = set()
-                while not best_group_ids:
-                    best_group_ids = self.get_best_group_ids_by_person_occurrences(
-                        person_ids=set(sorted_person_ids), candidate_group_ids=candidate_group_ids
+                if forbidden_group_indices:
+                    candidate_group_indices -= forbidden_group_indices
+                best_group_indices = set()
+                while not best_group_indices:
+                    best_group_indices = self.get_best_group_indices_by_person_occurrences(
+                        person_indices=sorted_person_indices, candidate_group_indices=candidate_group_indices
                     )
-                    if not best_group_ids:
-                        best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                            person_ids=set(sorted_person_ids), candidate_group_ids=candidate_group_ids
+                    if not best_group_indices:
+                        best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                            person_indices=sorted_person_indices, candidate_group_indices=candidate_group_indices
                         )
-                        if not best_group_ids:
-                            sorted_person_ids.pop()
-                if len(best_group_ids) > 1:
-                    best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                        person_ids=best_group_ids, candidate_group_ids=candidate_group_ids
+                        if not best_group_indices:
+                            sorted_person_indices.pop()
+                if len(best_group_indices) > 1:
+                    best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                        person_indices=sorted_person_indices, candidate_group_indices=best_group_indices
                     )
-                group_id = random_choice(best_group_ids)
-                person_ids = set(sorted_person_ids)
-                self.entry[group_id].update(person_ids)
-                self.remaining_person_ids -= person_ids
+                self.insert_persons(sorted_person_indices, random_choice(best_group_indices))
 
     def insert_couples_with_least_occurrences(self):
         # sort the person-person pairings using 2 keys:
         # - primary: number of occurrences where the 2 persons have been together
         # - secondary: minimum number of pairings for the 2 persons
-        sorted_person_occurrences = sorted(
-            random_shuffle(self.person_occurrences_map.values()),
-            key=lambda item: (
-                item['count'],
-                min(
-                    self.pairing_counts_map[item['person1Id']],
-                    self.pairing_counts_map[item['person2Id']]
-                )
+        person_count = len(self.person_id_list)
+        sorted_couples = sorted(
+            random_shuffle(
+                (idx1, idx2) for idx1 in range(person_count) for idx2 in range(idx1 + 1, person_count)
+            ),
+            key=lambda couple: (
+                self.person_counts[couple[0]][couple[1]],
+                min(self.pairing_counts[couple[0]], self.pairing_counts[couple[1]])
             )
         )
 
-        empty_group_ids = {
-            group_id for group_id in self.group_sizes.keys()
-            if not self.entry[group_id]
+        empty_group_indices = {
+            group_idx for group_idx, group_bitset in enumerate(self.group_bitsets)
+            if not group_bitset
         }
         # insert in empty groups couples of persons who have been the least frequently together
-        while len(self.remaining_person_ids) >= 2:
-            person_occurrence = sorted_person_occurrences.pop(0)
-            person1_id = person_occurrence['person1Id']
-            person2_id = person_occurrence['person2Id']
+        for idx1, idx2 in sorted_couples:
+            if self.remaining_bitset.bit_count() < 2:
+                return
+            couple_bitset = 1 << idx1 | 1 << idx2
             # if the two persons have not been already inserted
-            if person1_id in self.remaining_person_ids and person2_id in self.remaining_person_ids:
-                person_ids = {person1_id, person2_id}
-                best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                    person_ids=person_ids, candidate_group_ids=empty_group_ids
+            if self.remaining_bitset & couple_bitset == couple_bitset:
+                best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                    person_indices=[idx1, idx2], candidate_group_indices=empty_group_indices
                 )
-                if not best_group_ids:
+                if not best_group_indices:
                     return
-                group_id = random_choice(best_group_ids)
-                self.entry[group_id].update(person_ids)
-                self.remaining_person_ids.remove(person1_id)
-                self.remaining_person_ids.remove(person2_id)
-                empty_group_ids.remove(group_id)
+                group_idx = random_choice(best_group_indices)
+                self.insert_persons([idx1, idx2], group_idx)
+                empty_group_indices.remove(group_idx)
 
     def insert_remaining_persons(self):
-        # sort the person IDs according to their number of past pairings
-        sorted_remaining_person_ids = sorted(
-            random_shuffle(self.remaining_person_ids),
-            key=lambda person_id: self.pairing_counts_map[person_id]
+        # sort the person indices according to their number of past pairings
+        sorted_remaining_person_indices = sorted(
+            random_shuffle(get_bit_indices(self.remaining_bitset)),
+            key=lambda idx: self.pairing_counts[idx]
         )
 
         # put the remaining persons in non-full groups
         # in a way to minimize the average number of occurrences with other persons/groups
-        while sorted_remaining_person_ids:
-            # get the person ID with the lowest number of past pairings
-            person_id = sorted_remaining_person_ids.pop(0)
-            # get the set of candidate group IDs
-            best_group_ids = self.get_best_group_ids_by_person_occurrences(person_ids={person_id})
+        for idx in sorted_remaining_person_indices:
+            # get the set of candidate group indices
+            best_group_indices = self.get_best_group_indices_by_person_occurrences(person_indices=[idx])
             # if no group was found
-            if not best_group_ids:
-                best_group_ids = self.get_best_group_ids_by_group_occurrences(person_ids={person_id})
+            if not best_group_indices:
+                best_group_indices = self.get_best_group_indices_by_group_occurrences(person_indices=[idx])
             # if there is a tie
-            elif len(best_group_ids) > 1:
-                best_group_ids = self.get_best_group_ids_by_group_occurrences(
-                    person_ids={person_id}, candidate_group_ids=best_group_ids
+            elif len(best_group_indices) > 1:
+                best_group_indices = self.get_best_group_indices_by_group_occurrences(
+                    person_indices=[idx], candidate_group_indices=best_group_indices
                 )
             # in case there is still a tie, choose randomly
-            group_id = random_choice(best_group_ids)
-            self.entry[group_id].add(person_id)
+            self.insert_persons([idx], random_choice(best_group_indices))
 
-    def get_group_id(self, person_id):
+    def insert_persons(self, person_indices: list, group_idx: int):
         """
-        Get the group ID of where the person is in the entry, or None if the person is not found.
+        Insert persons in a group of the new entry.
 
-        :param person_id: the ID of the person to find
-        :return: the ID of the group where the person is, or None if the person is not found
+        :param person_indices: the indices of the persons to insert
+        :param group_idx: the index of the group
         """
-        for group_id, group in self.entry.items():
-            if person_id in group:
-                return group_id
-        return None
+        bitset = get_bitset(person_indices)
+        self.group_bitsets[group_idx] |= bitset
+        self.remaining_bitset &= ~bitset
+        for idx in person_indices:
+            self.person_group_indices[idx] = group_idx
+
+    def get_group_length(self, group_idx: int):
+        return self.group_bitsets[group_idx].bit_count()
 
-    def get_best_group_ids_by_person_occurrences(self, person_ids: set, candidate_group_ids=None):
+    def get_best_group_indices_by_person_occurrences(self, person_indices: list, candidate_group_indices=None):
         """
-        Get the IDs of the groups which minimize the redundancy of past person-person pairings.
+        Get the indices of the groups which minimize the redundancy of past person-person pairings.
 
-        :param person_ids: the set of IDs of the persons to insert
-        :param candidate_group_ids: the set of candidate group IDs
-        :return: the set of group IDs satisfying the conditions
+        :param person_indices: the indices of the persons to insert
+        :param candidate_group_indices: the set of candidate group indices
+        :return: the set of group indices satisfying the conditions
         """
-        # if no candidate group IDs were given
-        # or at least one candidate group ID does not exist
-        # then all group IDs are candidates
-        all_group_ids = set(self.group_sizes.keys())
-        if candidate_group_ids is None or not candidate_group_ids.issubset(all_group_ids):
-            candidate_group_ids = all_group_ids
-        # the IDs of the groups which are not empty and that can contain the subgroup
+        # if no candidate group indices were given, then all group indices are candidates
+        if candidate_group_indices is None:
+            candidate_group_indices = self.all_group_indices
+        # the indices of the groups which are not empty and that can contain the subgroup
         # (the group must be non-empty for the average of occurrences to be calculated)
-        candidate_group_ids = set(filter(
-            lambda group_id:
-                self.entry[group_id] and len(self.entry[group_id]) + len(person_ids) <= self.group_sizes[group_id],
-            candidate_group_ids
-        ))
-        # if no group ID was found
-        if not candidate_group_ids:
+        candidate_group_indices = {
+            group_idx for group_idx in candidate_group_indices
+            if self.group_bitsets[group_idx]
+            and self.get_group_length(group_idx) + len(person_indices) <= self.capacities[group_idx]
+        }
+        # if no group index was found
+        if not candidate_group_indices:
             return set()
-        # the dictionary giving for each candidate group ID
-        # the associated list of occurrences of each person to insert
-        # with all the persons in the group
-        person_occurrences_for_subgroup = {}
-        for group_id in candidate_group_ids:
-            person_occurrences_for_subgroup[group_id] = []
-            for person1_id in person_ids:
-                for person2_id in self.entry[group_id]:
-                    key = get_person_person_key(person1_id, person2_id)
-                    person_occurrences_for_subgroup[group_id].append(self.person_occurrences_map[key]['count'])
-        # the minimum average of occurrences of all the persons of the subgroup
-        # with any group of persons in the entry
-        min_person_occurrences_average = min([
-            sum(person_occurrences_for_subgroup[group_id]) / len(person_occurrences_for_subgroup[group_id])
-            for group_id in candidate_group_ids
-        ])
-        # the IDs of the groups of persons having the minimum average of occurrences with the subgroup
-        candidate_group_ids = set(filter(
-            lambda group_id:
-                sum(person_occurrences_for_subgroup[group_id]) / len(person_occurrences_for_subgroup[group_id])
-                == min_person_occurrences_average,
-            candidate_group_ids
-        ))
-        # the maximum group size in the candidate groups
-        max_group_size = max([
-            self.group_sizes[group_id] for group_id in candidate_group_ids
-        ])
-        # the IDs of the filtered groups which have the maximum size
-        candidate_group_ids = set(filter(
-            lambda group_id: self.group_sizes[group_id] == max_group_size,
-            candidate_group_ids
-        ))
-        return candidate_group_ids
+        # the dictionary giving for each candidate group index
+        # the average of occurrences of each person to insert with all the persons in the group
+        person_occurrences_averages = {}
+        for group_idx in candidate_group_indices:
+            member_indices = get_bit_indices(self.group_bitsets[group_idx])
+            occurrences = 0
+            for idx in person_indices:
+                person_counts = self.person_counts[idx]
+                occurrences += sum(person_counts[member_idx] for member_idx in member_indices)
+            person_occurrences_averages[group_idx] = occurrences / (len(person_indices) * len(member_indices))
+        # the indices of the groups of persons having the minimum average of occurrences with the subgroup
+        min_person_occurrences_average = min(person_occurrences_averages.values())
+        candidate_group_indices = {
+            group_idx for group_idx in candidate_group_indices
+            if person_occurrences_averages[group_idx] == min_person_occurrences_average
+        }
+        return self.get_largest_group_indices(candidate_group_indices)
 
-    def get_best_group_ids_by_group_occurrences(self, person_ids: set, candidate_group_ids=None):
+    def get_best_group_indices_by_group_occurrences(self, person_indices: list, candidate_group_indices=None):
         """
-        Get the IDs of the groups which minimize the redundancy of past person-group pairings.
+        Get the indices of the groups which minimize the redundancy of past person-group pairings.
 
-        :param person_ids: the set of IDs of the persons to insert
-        :param candidate_group_ids: the set of candidate group IDs
-        :return: the set of group IDs satisfying the conditions
+        :param person_indices: the indices of the persons to insert
+        :param candidate_group_indices: the set of candidate group indices
+        :return: the set of group indices satisfying the conditions
         """
-        # if no candidate group IDs were given
-        # or at least one candidate group ID does not exist
-        # then all group IDs are candidates
-        all_group_ids = set(self.group_sizes.keys())
-        if candidate_group_ids is None or not candidate_group_ids.issubset(all_group_ids):
-            candidate_group_ids = all_group_ids
-        # the IDs of the groups that can contain the persons to insert
-        candidate_group_ids = set(filter(
-            lambda group_id:
-                len(self.entry[group_id]) + len(person_ids) <= self.group_sizes[group_id],
-            candidate_group_ids
-        ))
-        # if no group ID was found
-        if not candidate_group_ids:
+        # if no candidate group indices were given, then all group indices are candidates
+        if candidate_group_indices is None:
+            candidate_group_indices = self.all_group_indices
+        # the indices of the groups that can contain the persons to insert
+        candidate_group_indices = {
+            group_idx for group_idx in candidate_group_indices
+            if self.get_group_length(group_idx) + len(person_indices) <= self.capacities[group_idx]
+        }
+        # if no group index was found
+        if not candidate_group_indices:
             return set()
-        # the dictionary giving for each candidate group ID
-        # the associated list of occurrences of each person to insert with the group
-        group_occurrences_for_subgroup = {
-            group_id: [
-                self.group_occurrences_map[get_person_group_key(person_id, group_id)]['count']
-                for person_id in person_ids
-            ]
-            for group_id in candidate_group_ids
+        # the dictionary giving for each candidate group index
+        # the average of occurrences of each person to insert with the group
+        group_occurrences_averages = {
+            group_idx: sum(self.group_counts[idx][group_idx] for idx in person_indices) / len(person_indices)
+            for group_idx in candidate_group_indices
+        }
+        # the indices of the candidate groups which have the minimum number of occurrences with the persons
+        min_group_occurrences_average = min(group_occurrences_averages.values())
+        candidate_group_indices = {
+            group_idx for group_idx in candidate_group_indices
+            if group_occurrences_averages[group_idx] == min_group_occurrences_average
+        }
+        return self.get_largest_group_indices(candidate_group_indices)
+
+    def get_largest_group_indices(self, group_indices: set):
+        """
+        Get the indices of the groups which have the maximum size.
+
+        :param group_indices: the set of group indices
+        :return: the set of indices of the largest groups
+        """
+        max_group_size = max(self.capacities[group_idx] for group_idx in group_indices)
+        return {
+            group_idx for group_idx in group_indices
+            if self.capacities[group_idx] == max_group_size
         }
-        # the minimum average of occurrences of any person to insert with any of the candidate groups
-        min_group_occurrences_average = min([
-            sum(group_occurrences_for_subgroup[group_id]) / len(group_occurrences_for_subgroup[group_id])
-            for group_id in candidate_group_ids
-        ])
-        # the IDs of the candidate groups which have the minimum number of occurrences with the person
-        candidate_group_ids = set(filter(
-            lambda group_id:
-                sum(group_occurrences_for_subgroup[group_id]) / len(group_occurrences_for_subgroup[group_id])
-                == min_group_occurrences_average,
-            candidate_group_ids
-        ))
-        # the maximum group size in the candidate groups
-        max_group_size = max([
-            self.group_sizes[group_id] for group_id in candidate_group_ids
-        ])
-        # the IDs of the filtered groups which have the maximum size
-        candidate_group_ids = set(filter(
-            lambda group_id: self.group_sizes[group_id] == max_group_size,
-            candidate_group_ids
-        ))
-        return candidate_group_ids
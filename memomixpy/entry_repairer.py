@@ -0,0 +1,176 @@
+from .history_index import HistoryIndex
+from .util import random_shuffle
+
+class EntryRepairer:
+    def __init__(self, group_sizes: dict, history_index: HistoryIndex, constraints: list, entry: dict):
+        """
+        Constructor.
+
+        :param group_sizes: the dictionary of group capacities
+        :param history_index: the index of the past pairings
+        :param constraints: the list of constraints
+        :param entry: the previously announced entry to repair
+        """
+        self.group_sizes = group_sizes
+        self.history_index = history_index
+        self.constraints = constraints
+
+        # the announced size of each group, that the repair tries to keep
+        self.announced_sizes = {group_id: len(entry.get(group_id, ())) for group_id in group_sizes}
+        self.entry = {group_id: set(entry.get(group_id, ())) for group_id in group_sizes}
+        self.person_group_ids = {
+            person_id: group_id
+            for group_id, group in self.entry.items()
+            for person_id in group
+        }
+
+    def repair_entry(self, added_person_ids: set, removed_person_ids: set):
+        """
+        Repair the entry after last-minute roster changes, moving as few persons as possible.
+
+        :param added_person_ids: the set of IDs of the persons to add
+        :param removed_person_ids: the set of IDs of the persons to remove
+        :return: the repaired entry
+        """
+        for person_id in removed_person_ids:
+            group_id = self.person_group_ids.pop(person_id, None)
+            if group_id is not None:
+                self.entry[group_id].remove(person_id)
+        # place the newcomers, filling in priority the holes left by the removed persons
+        for person_id in sorted(
+            random_shuffle(set(added_person_ids) - set(self.person_group_ids)),
+            key=self.history_index.get_pairing_count
+        ):
+            group_id = self.get_best_group_id(person_id)
+            assert group_id is not None, f"The person '{person_id}' cannot be inserted in any group."
+            self.insert_person(person_id, group_id)
+        self.rebalance_groups()
+        return self.entry
+
+    def rebalance_groups(self):
+        # only the groups used in the announced entry are rebalanced
+        used_group_ids = {group_id for group_id, size in self.announced_sizes.items() if size}
+        while used_group_ids:
+            largest_group_id = max(used_group_ids, key=lambda group_id: len(self.entry[group_id]))
+            largest_size = len(self.entry[largest_group_id])
+            # move a person from the largest group to a group with at least 2 persons less
+            small_group_ids = {
+                group_id for group_id in used_group_ids
+                if len(self.entry[group_id]) < largest_size - 1
+            }
+            if small_group_ids and self.move_best_person(self.entry[largest_group_id], small_group_ids):
+                continue
+            # do not leave a person alone in a group
+            lonely_group_ids = {
+                group_id for group_id in used_group_ids
+                if len(self.entry[group_id]) == 1
+            }
+            if largest_size > 1 and any(
+                self.move_best_person(self.entry[group_id], used_group_ids - {group_id})
+                for group_id in lonely_group_ids
+            ):
+                used_group_ids = {group_id for group_id in used_group_ids if self.entry[group_id]}
+                continue
+            return
+
+    def move_best_person(self, person_ids: set, candidate_group_ids: set):
+        """
+        Move the person whose move adds the least redundancy to one of the candidate groups.
+
+        :param person_ids: the set of IDs of the persons that can be moved
+        :param candidate_group_ids: the set of IDs of the destination groups
+        :return: True if a person was moved, False otherwise
+        """
+        best_move = None
+        best_cost = None
+        for person_id in random_shuffle(person_ids):
+            # the persons of 'together' constraints stay with their partners
+            if self.is_together_constrained(person_id):
+                continue
+            source_group_id = self.person_group_ids[person_id]
+            saved_redundancy = self.get_redundancy(person_id, self.entry[source_group_id] - {person_id})
+            for group_id in candidate_group_ids:
+                if not self.can_insert(person_id, group_id):
+                    continue
+                cost = (
+                    self.get_redundancy(person_id, self.entry[group_id]) - saved_redundancy,
+                    self.history_index.get_group_count(person_id, group_id)
+                )
+                if best_cost is None or cost < best_cost:
+                    best_move = (person_id, group_id)
+                    best_cost = cost
+        if best_move is None:
+            return False
+        person_id, group_id = best_move
+        self.entry[self.person_group_ids[person_id]].remove(person_id)
+        self.insert_person(person_id, group_id)
+        return True
+
+    def get_best_group_id(self, person_id: str):
+        """
+        Get the ID of the group where inserting the person best fills the holes
+        and adds the least redundancy, or None if the person cannot be inserted.
+
+        :param person_id: the ID of the person to insert
+        :return: the ID of the best group, or None
+        """
+        best_group_id = None
+        best_cost = None
+        for group_id in random_shuffle(self.group_sizes):
+            if not self.can_insert(person_id, group_id):
+                continue
+            group = self.entry[group_id]
+            cost = (
+                len(group) - self.announced_sizes[group_id],
+                self.get_redundancy(person_id, group) / len(group) if group else 0,
+                self.history_index.get_group_count(person_id, group_id)
+            )
+            if best_cost is None or cost < best_cost:
+                best_group_id = group_id
+                best_cost = cost
+        return best_group_id
+
+    def can_insert(self, person_id: str, group_id: str):
+        """
+        Check that the person can be inserted in the group without breaking a constraint.
+
+        :param person_id: the ID of the person
+        :param group_id: the ID of the group
+        :return: True if the person can be inserted, False otherwise
+        """
+        group = self.entry[group_id]
+        if len(group) >= self.group_sizes[group_id]:
+            return False
+        for constraint in self.constraints:
+            if person_id not in constraint['persons']:
+                continue
+            partner_ids = set(constraint['persons']) - {person_id}
+            if constraint['type'] == 'apart':
+                if partner_ids & group:
+                    return False
+            elif constraint['type'] == 'together':
+                mandatory_group_id = constraint.get('mandatoryGroup')
+                if mandatory_group_id and group_id != mandatory_group_id:
+                    return False
+                if group_id in (constraint.get('forbiddenGroups') or set()):
+                    return False
+                placed_group_ids = {
+                    self.person_group_ids[partner_id] for partner_id in partner_ids
+                    if partner_id in self.person_group_ids
+                }
+                if placed_group_ids and group_id not in placed_group_ids:
+                    return False
+        return True
+
+    def is_together_constrained(self, person_id: str):
+        return any(
+            constraint['type'] == 'together' and person_id in constraint['persons']
+            for constraint in self.constraints
+        )
+
+    def get_redundancy(self, person_id: str, group: set):
+        return sum(self.history_index.get_person_count(person_id, other_id) for other_id in group)
+
+    def insert_person(self, person_id: str, group_id: str):
+        self.entry[group_id].add(person_id)
+        self.person_group_ids[person_id] = group_id
@@ -0,0 +1,160 @@
+from .compact_entry import CompactEntry
+from .layered_dict import LayeredDict
+from .util import get_person_person_key, get_person_group_key
+
+class HistoryIndex:
+    """
+    Running tallies of the past pairings of a history.
+
+    The tallies are sparse and independent of the current roster and groups:
+    persons and groups that are no longer used are kept, so that they can be added back
+    without replaying the history.
+    They are layered dictionaries, so that copying an index only copies the changes since the last fold.
+    """
+    def __init__(self, history=None, checkpoint=None):
+        """
+        Constructor.
+
+        :param history: the history of past entries to index
+        :param checkpoint: the index of older entries to start from
+        """
+        # fix mutable default parameters side effect
+        if history is None:
+            history = []
+
+        # person ID -> number of past pairings with other persons
+        self.pairing_counts = LayeredDict()
+        # person-person key -> number of past occurrences together
+        self.person_counts = LayeredDict()
+        # person-group key -> number of past occurrences in the group
+        self.group_counts = LayeredDict()
+        # number of indexed entries
+        self.entry_count = 0
+
+        if checkpoint is not None:
+            self.pairing_counts = checkpoint.pairing_counts.copy()
+            self.person_counts = checkpoint.person_counts.copy()
+            self.group_counts = checkpoint.group_counts.copy()
+            self.entry_count = checkpoint.entry_count
+        for entry in history:
+            self.add_entry(entry)
+
+    def add_entry(self, entry: dict, weight: int=1, with_groups: bool=True):
+        """
+        Add the pairings of an entry to the tallies.
+
+        :param entry: the entry to add
+        :param weight: the number of times the entry is added (negative to remove it)
+        :param with_groups: whether the person-group pairings are added too
+        """
+        # the groups are sliced from the persons laid out group by group, which compact entries already are
+        group_id_list, member_ids, group_offsets = CompactEntry.get_entry_members(entry)
+        for group_id, start, end in zip(group_id_list, group_offsets, group_offsets[1:]):
+            group = member_ids[start:end]
+            for idx, person1_id in enumerate(group):
+                self._increment(self.pairing_counts, person1_id, weight * (len(group) - 1))
+                for person2_id in group[idx + 1:]:
+                    key = get_person_person_key(person1_id, person2_id)
+                    self._increment(self.person_counts, key, weight)
+                if with_groups:
+                    key = get_person_group_key(person1_id, group_id)
+                    self._increment(self.group_counts, key, weight)
+        self.entry_count += weight
+
+    def add_index(self, history_index, weight: int=1, with_groups: bool=True):
+        """
+        Add the tallies of another index, without replaying its entries.
+
+        :param history_index: the index to add
+        :param weight: the number of times the tallies are added (negative to remove them)
+        :param with_groups: whether the person-group pairings are added too
+        """
+        for person_id, count in history_index.pairing_counts.items():
+            self._increment(self.pairing_counts, person_id, weight * count)
+        for key, count in history_index.person_counts.items():
+            self._increment(self.person_counts, key, weight * count)
+        if with_groups:
+            for key, count in history_index.group_counts.items():
+                self._increment(self.group_counts, key, weight * count)
+        self.entry_count += weight * history_index.entry_count
+
+    def remove_entry(self, entry: dict):
+        """
+        Remove the pairings of a previously added entry from the tallies.
+
+        :param entry: the entry to remove
+        """
+        self.add_entry(entry, weight=-1)
+
+    def to_object(self):
+        """
+        Get the JSON object of the tallies.
+
+        :return: the object
+        """
+        return {
+            'pairingCounts': dict(self.pairing_counts),
+            'personCounts': dict(self.person_counts),
+            'groupCounts': dict(self.group_counts),
+            'entryCount': self.entry_count
+        }
+
+    @staticmethod
+    def from_object(index_object: dict):
+        """
+        Build an index from the JSON object of its tallies.
+
+        :param index_object: the object
+        :return: the index
+        """
+        index = HistoryIndex()
+        index.pairing_counts = LayeredDict(dict(index_object['pairingCounts']))
+        index.person_counts = LayeredDict(dict(index_object['personCounts']))
+        index.group_counts = LayeredDict(dict(index_object['groupCounts']))
+        index.entry_count = index_object['entryCount']
+        return index
+
+    def get_pairing_count(self, person_id: str):
+        """
+        Get the number of past pairings of a person with other persons.
+
+        :param person_id: the ID of the person
+        :return: the number of past pairings
+        """
+        return self.pairing_counts.get(person_id, 0)
+
+    def get_person_count(self, person1_id: str, person2_id: str):
+        """
+        Get the number of past occurrences of 2 persons together.
+
+        :param person1_id: the ID of the first person
+        :param person2_id: the ID of the second person
+        :return: the number of past occurrences
+        """
+        return self.person_counts.get(get_person_person_key(person1_id, person2_id), 0)
+
+    def get_group_count(self, person_id: str, group_id: str):
+        """
+        Get the number of past occurrences of a person in a group.
+
+        :param person_id: the ID of the person
+        :param group_id: the ID of the group
+        :return: the number of past occurrences
+        """
+        return self.group_counts.get(get_person_group_key(person_id, group_id), 0)
+
+    def get_person_count_items(self):
+        """
+        Get the non-null past occurrences of the person-person pairings.
+
+        :return: the iterator of (person-person key, count) pairs
+        """
+        return iter(self.person_counts.items())
+
+    def _increment(self, counts: LayeredDict, key, value: int):
+        count = counts.get(key, 0) + value
+        # keep the tallies sparse
+        if count:
+            counts[key] = count
+        else:
+            counts.pop(key, None)
@@ -0,0 +1,87 @@
+# Validation of a whole history: all the offending entries are reported at once,
+# instead of stopping at the first problem.
+
+def validate_history(history: list, person_ids: set, group_sizes: dict):
+    """
+    Validate a whole history at once.
+    Unknown persons and groups, as well as groups over their current capacity,
+    can be legitimate in the past entries of a roster that changed, so they are only reported.
+
+    :param history: the history of past entries
+    :param person_ids: the set of person IDs of the roster
+    :param group_sizes: the dictionary of group capacities
+    :return: the dictionary giving, for each kind of problem ('duplicatePersons', 'unknownPersons',
+    'unknownGroups', 'overCapacityGroups'), the sorted list of the indices of the offending entries
+    """
+    return {
+        'duplicatePersons': get_duplicate_person_entry_indices(history),
+        'unknownPersons': get_unknown_person_entry_indices(history, person_ids),
+        'unknownGroups': get_unknown_group_entry_indices(history, group_sizes),
+        'overCapacityGroups': get_over_capacity_entry_indices(history, group_sizes)
+    }
+
+def get_duplicate_person_entry_indices(history: list):
+    """
+    Get the indices of the entries where a person appears more than once.
+
+    :param history: the history of past entries
+    :return: the sorted list of entry indices
+    """
+    entry_indices = []
+    for index, entry in enumerate(history):
+        # a person appears more than once if the entry has more persons than distinct persons
+        person_count = 0
+        used_person_ids = set()
+        for group in entry.values():
+            person_count += len(group)
+            used_person_ids.update(group)
+        if person_count != len(used_person_ids):
+            entry_indices.append(index)
+    return entry_indices
+
+def get_unknown_person_entry_indices(history: list, person_ids: set):
+    """
+    Get the indices of the entries containing persons that are not in the roster.
+
+    :param history: the history of past entries
+    :param person_ids: the set of person IDs of the roster
+    :return: the sorted list of entry indices
+    """
+    entry_indices = []
+    for index, entry in enumerate(history):
+        for group in entry.values():
+            if not person_ids.issuperset(group):
+                entry_indices.append(index)
+                break
+    return entry_indices
+
+def get_unknown_group_entry_indices(history: list, group_sizes: dict):
+    """
+    Get the indices of the entries containing groups that do not exist.
+
+    :param history: the history of past entries
+    :param group_sizes: the dictionary of group capacities
+    :return: the sorted list of entry indices
+    """
+    return [
+        index for index, entry in enumerate(history)
+        if any(group_id not in group_sizes for group_id in entry)
+    ]
+
+def get_over_capacity_entry_indices(history: list, group_sizes: dict):
+    """
+    Get the indices of the entries containing groups with more persons than their capacity.
+    The groups that do not exist are ignored.
+
+    :param history: the history of past entries
+    :param group_sizes: the dictionary of group capacities
+    :return: the sorted list of entry indices
+    """
+    entry_indices = []
+    for index, entry in enumerate(history):
+        for group_id, group in entry.items():
+            # the groups that do not exist have an unbounded capacity
+            if len(group) > group_sizes.get(group_id, float('inf')):
+                entry_indices.append(index)
+                break
+    return entry_indices
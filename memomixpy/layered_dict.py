@@ -0,0 +1,112 @@
+from collections.abc import MutableMapping
+
+class Removed:
+    """
+    Marker of the keys removed by the delta of a layered dictionary.
+    """
+    def __reduce__(self):
+        # unpickled as the same marker, since it is compared by identity
+        return 'REMOVED'
+
+REMOVED = Removed()
+MISSING = object()
+
+# the delta is folded into a new base when it exceeds this fraction of the base
+FOLD_RATIO = 8
+
+class LayeredDict(MutableMapping):
+    """
+    Dictionary made of a base that is never modified and a small delta of the changes made since,
+    so that a new version can be derived with a cost proportional to the delta instead of the whole dictionary.
+
+    A copy shares the base and only copies the delta. The delta is folded into a new base
+    when it grows too large, or for free when the merged dictionary was already built for an iteration.
+    The published versions must not be modified: the changes are made to a copy, before it is published.
+    """
+    def __init__(self, base: dict=None, delta: dict=None):
+        """
+        Constructor.
+
+        :param base: the base dictionary, which is never modified
+        :param delta: the dictionary of changed values, with REMOVED for the removed keys
+        """
+        self.base = {} if base is None else base
+        self.delta = {} if delta is None else delta
+        # the merged dictionary, built lazily for the iterations
+        self.merged = None
+
+    def copy(self):
+        """
+        Get a copy that can be modified, with a cost proportional to the delta.
+
+        :return: the copy
+        """
+        if self.merged is not None:
+            return LayeredDict(self.merged)
+        if len(self.delta) > len(self.base) // FOLD_RATIO:
+            return LayeredDict(self.get_merged())
+        return LayeredDict(self.base, dict(self.delta))
+
+    def get_merged(self):
+        """
+        Get the whole dictionary, with the delta applied to the base.
+        It is built once per version and must not be modified.
+
+        :return: the dictionary
+        """
+        merged = self.merged
+        if merged is None:
+            merged = dict(self.base)
+            for key, value in self.delta.items():
+                if value is REMOVED:
+                    del merged[key]
+                else:
+                    merged[key] = value
+            self.merged = merged
+        return merged
+
+    def get(self, key, default=None):
+        value = self.delta.get(key, MISSING)
+        if value is MISSING:
+            return self.base.get(key, default)
+        return default if value is REMOVED else value
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __setitem__(self, key, value):
+        self.delta[key] = value
+        self.merged = None
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self.base:
+            self.delta[key] = REMOVED
+        else:
+            del self.delta[key]
+        self.merged = None
+
+    def __iter__(self):
+        return iter(self.get_merged())
+
+    def __len__(self):
+        return len(self.get_merged())
+
+    def keys(self):
+        return self.get_merged().keys()
+
+    def values(self):
+        return self.get_merged().values()
+
+    def items(self):
+        return self.get_merged().items()
+
+    def __repr__(self):
+        return f'LayeredDict({self.get_merged()!r})'
@@ -0,0 +1,108 @@
+import json
+
+from .history_index import HistoryIndex
+from .util import get_person_person_key
+
+# Lower bound certificates on the redundancy reachable by an entry:
+# every entry contains at least as many person-person pairings as the most even spread of the persons
+# over the groups, and each of them costs at least as much as one of the least redundant pairs.
+
+def get_min_pairing_count(person_count: int, group_sizes: dict):
+    """
+    Get the minimum number of person-person pairings of an entry,
+    reached when the persons are spread as evenly as the group capacities allow.
+
+    :param person_count: the number of persons
+    :param group_sizes: the dictionary of group capacities
+    :return: the minimum number of pairings
+    """
+    pairing_count = 0
+    remaining_person_count = person_count
+    sorted_sizes = sorted(group_sizes.values())
+    for idx, size in enumerate(sorted_sizes):
+        remaining_group_count = len(sorted_sizes) - idx
+        # the smallest groups are filled up if their capacity is below the even share
+        if size <= remaining_person_count // remaining_group_count:
+            pairing_count += size * (size - 1) // 2
+            remaining_person_count -= size
+        else:
+            share, extra_person_count = divmod(remaining_person_count, remaining_group_count)
+            pairing_count += extra_person_count * (share + 1) * share // 2
+            pairing_count += (remaining_group_count - extra_person_count) * share * (share - 1) // 2
+            break
+    return pairing_count
+
+def get_forced_pair_keys(person_ids: set, group_sizes: dict, constraints: list):
+    """
+    Get the keys of the person-person pairings forced by the 'together' constraints,
+    i.e. the pairs of persons linked by a chain of 'together' constraints that fits in a group.
+
+    :param person_ids: the set of person IDs
+    :param group_sizes: the dictionary of group capacities
+    :param constraints: the list of constraints
+    :return: the set of keys of the forced pairings
+    """
+    # union-find of the persons linked by 'together' constraints
+    parents = {}
+
+    def find(person_id):
+        while parents.get(person_id, person_id) != person_id:
+            person_id = parents[person_id]
+        return person_id
+
+    for constraint in constraints:
+        if constraint['type'] != 'together':
+            continue
+        constrained_ids = [person_id for person_id in constraint['persons'] if person_id in person_ids]
+        for person_id in constrained_ids:
+            parents.setdefault(person_id, person_id)
+        for person_id in constrained_ids[1:]:
+            parents[find(person_id)] = find(constrained_ids[0])
+    components = {}
+    for person_id in parents:
+        components.setdefault(find(person_id), set()).add(person_id)
+    max_group_size = max(group_sizes.values())
+    forced_pair_keys = set()
+    for component in components.values():
+        # a chain of constraints that does not fit in a group cannot be satisfied
+        if len(component) > max_group_size:
+            continue
+        component = list(component)
+        for idx, person1_id in enumerate(component):
+            for person2_id in component[idx + 1:]:
+                forced_pair_keys.add(get_person_person_key(person1_id, person2_id))
+    return forced_pair_keys
+
+def get_redundancy_lower_bound(person_ids: set, group_sizes: dict, history_index: HistoryIndex, constraints: list):
+    """
+    Get a lower bound on the redundancy of any entry satisfying the 'together' constraints:
+    the forced pairings are counted, and the other pairings required by the group capacities
+    are assumed to be the least redundant pairs of the roster.
+
+    :param person_ids: the set of person IDs
+    :param group_sizes: the dictionary of group capacities
+    :param history_index: the index of the past pairings (or a combined view of the shared pairings)
+    :param constraints: the list of constraints
+    :return: the lower bound
+    """
+    forced_pair_keys = get_forced_pair_keys(person_ids, group_sizes, constraints)
+    lower_bound = sum(history_index.get_person_count(*json.loads(key)) for key in forced_pair_keys)
+    free_pairing_count = get_min_pairing_count(len(person_ids), group_sizes) - len(forced_pair_keys)
+    # the histogram of the non-null counts of the pairs of the roster that are not forced
+    count_histogram = {}
+    for key, count in history_index.get_person_count_items():
+        if key in forced_pair_keys:
+            continue
+        person1_id, person2_id = json.loads(key)
+        if person1_id in person_ids and person2_id in person_ids:
+            count_histogram[count] = count_histogram.get(count, 0) + 1
+    # the pairs that never met cost nothing
+    person_count = len(person_ids)
+    free_pairing_count -= person_count * (person_count - 1) // 2 - len(forced_pair_keys) \
+        - sum(count_histogram.values())
+    for count in sorted(count_histogram):
+        if free_pairing_count <= 0:
+            break
+        lower_bound += count * min(free_pairing_count, count_histogram[count])
+        free_pairing_count -= count_histogram[count]
+    return lower_bound
@@ -1,8 +1,12 @@
-from entry_generator import EntryGenerator
-from util import get_person_person_key, get_person_group_key
+import threading
 
-# IDEAS:
-# - attribute to prioritize new person-group pairings instead of new person-person pairings
+from .compact_entry import CompactEntry
+from .history_index import HistoryIndex
+from .history_validator import get_duplicate_person_entry_indices, validate_history
+from .rotation_schedule import RotationSchedule
+from .shared_history_index import SharedHistoryIndex, CombinedHistoryIndex
+from .snapshot import MemoMixSnapshot
+from .util import get_person_person_key, get_person_group_key
 
 # CAVEATS:
 # 1. Finding the group configuration that has the lowest redundancy is a NP-hard problem.
@@ -11,7 +15,12 @@ from util import get_person_person_key, get_person_group_key
 # For example, if the ID is the surname, add another letter in the ID for the last name.
 
 class MemoMix:
-    def __init__(self, persons: set, group_sizes: dict, history=None, constraints=None):
+    def __init__(
+        self, persons: set, group_sizes: dict, history=None, constraints=None,
+        checkpoint: HistoryIndex=None, history_limit: int=None, approximation_width: int=None,
+        prioritize_groups: bool=False, speculation_attempts: int=None, speculation_executor=None,
+        shared_index: SharedHistoryIndex=None, shared_project_id: str=None, shared_weight: float=1
+    ):
         """
         Constructor.
 
@@ -19,6 +28,24 @@ class MemoMix:
         :param group_sizes: the dictionary of group capacities
         :param history: the history of past entries
         :param constraints: the list of constraints
+        :param checkpoint: the index of the entries older than the history
+        :param history_limit: the number of recent entries kept in the history,
+        the older ones being folded into the checkpoint (unlimited if None)
+        :param approximation_width: the number of candidate partners and groups considered for each person
+        by the approximate generation for huge rosters (exact generation if None)
+        :param prioritize_groups: whether to avoid repeated person-group pairings (e.g. for rotations of duties)
+        rather than repeated person-person pairings
+        :param speculation_attempts: the number of attempts of the best next entry generated in the background
+        after each write, and served by the next call to generate_entry (no speculation if None)
+        :param speculation_executor: the executor running the speculative generations
+        (a dedicated thread if None)
+        :param shared_index: the index of the past pairings shared with other projects whose rosters overlap,
+        to which the history and the saved entries of the project are added (no sharing if None).
+        The instance owns the registration of its project ID until it is detached with detach_shared_index,
+        or until another instance is created with the same project ID, e.g. when the project is reloaded:
+        the tallies of the new instance replace its ones, and it can no longer save entries
+        :param shared_project_id: the ID of the project in the shared index
+        :param shared_weight: the weight of the pairings of the other projects, relative to the ones of the project
         """
         # fix mutable default parameters side effect
         if history is None:
@@ -28,80 +55,309 @@ class MemoMix:
 
         self.check_positive_group_sizes(group_sizes)
         self.check_sufficient_group_sizes(persons, group_sizes)
-        for entry in history:
-            self.check_entry_validity(entry)
+        self.check_history_validity(history)
+        self.check_constraints_validity(constraints, persons, group_sizes)
 
-        self.person_ids = persons
-        self.group_sizes = group_sizes
-        self.history = history
+        # copied, since the compaction drops the older entries of the list
+        self.history = list(history)
+        self.history_limit = history_limit
+        history_index = HistoryIndex(history, checkpoint)
+        shared_version = None
+        if shared_index is not None:
+            assert shared_project_id is not None, 'The project ID in the shared index is missing.'
+            assert shared_weight >= 0, 'The weight of the shared pairings is negative.'
+            shared_version = shared_index.attach(shared_project_id, history_index)
+        partner_candidates = None
+        if approximation_width is not None:
+            assert approximation_width >= 1, 'The approximation width is negative or null.'
+            from .approximate_entry_generator import PartnerCandidates
+            partner_candidates = PartnerCandidates(
+                CombinedHistoryIndex.combine(history_index, shared_index, shared_project_id, shared_weight),
+                approximation_width
+            )
+        person_ids = frozenset(persons)
+        group_sizes = dict(group_sizes)
+        constraints = tuple(constraints)
+        # the current version of the state, replaced as a whole by each write
+        self.snapshot = MemoMixSnapshot(
+            version=0, person_ids=person_ids, group_sizes=group_sizes, constraints=constraints,
+            history_index=history_index,
+            rotation_schedule=self.create_rotation_schedule(
+                person_ids, group_sizes, constraints, history_index, shared_index
+            ),
+            approximation_width=approximation_width, partner_candidates=partner_candidates,
+            prioritize_groups=prioritize_groups, shared_index=shared_index, shared_project_id=shared_project_id,
+            shared_weight=shared_weight, shared_version=shared_version
+        )
+        # the lock serializing the writes
+        self.write_lock = threading.RLock()
+        # the lock serializing the asynchronous calls, created lazily in the running event loop
+        self.async_lock = None
+        if speculation_attempts is not None:
+            assert speculation_attempts >= 1, 'The number of speculation attempts is negative or null.'
+        self.speculation_attempts = speculation_attempts
+        self.speculation_executor = speculation_executor
+        # the versions of the snapshot and of the shared index, and the future of the speculative next entry
+        self.speculation = None
+        self.speculate()
 
-        self.check_constraints_validity(constraints)
-        self.constraints = constraints
+        if history_limit is not None:
+            self.compact_history(history_limit)
 
-    def get_occurrences_maps(self):
+    @property
+    def person_ids(self):
+        return self.snapshot.person_ids
+
+    @property
+    def group_sizes(self):
+        return self.snapshot.group_sizes
+
+    @property
+    def constraints(self):
+        return self.snapshot.constraints
+
+    @property
+    def history_index(self):
+        return self.snapshot.history_index
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def get_snapshot(self):
         """
-        Get 3 maps containing respectively:
-        - the count, for each person, of past pairings with other persons,
-        - the count of occurrences of past person-person pairings,
-        - the count of occurrences of past person-group pairings.
+        Get the current version of the state. It is never modified by the later writes,
+        so that entries can be generated from it without locks, in other threads or processes.
 
-        :return: the 3 dictionaries
+        :return: the snapshot
         """
-        # initialize the maps with zeros
-        pairing_counts_map = {}
-        person_occurrences_map = {}
-        group_occurrences_map = {}
-        person_ids = list(self.person_ids)
-        for idx, person1_id in enumerate(person_ids):
-            pairing_counts_map[person1_id] = 0
-            for person2_id in person_ids[idx + 1:]:
-                if person1_id != person2_id:
-                    key = get_person_person_key(person1_id, person2_id)
-                    person_occurrences_map[key] = {
-                        'person1Id': person1_id,
-                        'person2Id': person2_id,
-                        'count': 0
-                    }
-            for group_id in self.group_sizes:
-                key = get_person_group_key(person1_id, group_id)
-                group_occurrences_map[key] = {
-                    'personId': person1_id,
-                    'groupId': group_id,
-                    'count': 0
-                }
-
-        # count the number of occurrences of past person-person and person-group pairings
-        for entry in self.history:
-            for group_id, group in entry.items():
-                group = list(group)
-                for idx, person1_id in enumerate(group):
-                    pairing_counts_map[person1_id] += len(group) - 1
-                    for person2_id in group[idx + 1:]:
-                        if person1_id in self.person_ids and person2_id in self.person_ids:
-                            key = get_person_person_key(person1_id, person2_id)
-                            person_occurrences_map[key]['count'] += 1
+        return self.snapshot
 
-                    key = get_person_group_key(person1_id, group_id)
-                    group_occurrences_map[key]['count'] += 1
+    def publish(self, **changes):
+        """
+        Publish the next version of the state, with some attributes changed.
+        Must be called with the write lock held.
+
+        :param changes: the new values of the changed attributes of the snapshot
+        """
+        # the replacement of the reference is atomic, the readers see either version as a whole
+        self.snapshot = self.snapshot.replace(**changes)
+        self.speculate()
+
+    def speculate(self):
+        """
+        Start generating the next entry of the current snapshot in the background, if speculation is enabled.
+        The speculation on the previous version is cancelled if it has not started yet, and ignored otherwise.
+        Must be called with the write lock held.
+        """
+        if self.speculation_attempts is None:
+            return
+        if self.speculation is not None:
+            self.speculation[1].cancel()
+        if self.speculation_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.speculation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='memomix-speculation')
+        snapshot = self.snapshot
+        if self.speculation_attempts > 1:
+            future = self.speculation_executor.submit(snapshot.generate_best_entry, self.speculation_attempts)
+        else:
+            future = self.speculation_executor.submit(snapshot.generate_entry)
+        self.speculation = ((snapshot.version, snapshot.get_shared_version()), future)
 
-        return pairing_counts_map, person_occurrences_map, group_occurrences_map
+    def take_speculation(self):
+        """
+        Take the future of the speculative next entry of the current snapshot, so that it is served only once.
+
+        :return: the future, or None if there is no speculation on the current snapshot
+        """
+        with self.write_lock:
+            speculation = self.speculation
+            snapshot = self.snapshot
+            # the speculation is also stale after a save of another project sharing the index
+            if speculation is None or speculation[0] != (snapshot.version, snapshot.get_shared_version()) \
+                    or speculation[1].cancelled():
+                return None
+            self.speculation = None
+            return speculation[1]
+
+    def get_occurrences_maps(self):
+        """
+        Get the 3 occurrences maps of the current snapshot.
+
+        :return: the 3 dictionaries
+        """
+        return self.snapshot.get_occurrences_maps()
 
-    def generate_entry(self):
+    def generate_entry(self, compact: bool=False):
         """
         Generate a new possible entry that satisfies the constraints
         and minimizes the redundancy of past pairings.
 
+        :param compact: whether to return a compact entry instead of a dictionary of sets
         :return: a new entry
         """
-        pairing_counts_map, person_occurrences_map, group_occurrences_map = self.get_occurrences_maps()
-        generator = EntryGenerator(
-            person_ids=self.person_ids, group_sizes=self.group_sizes,
-            pairing_counts_map=pairing_counts_map,
-            person_occurrences_map=person_occurrences_map,
-            group_occurrences_map=group_occurrences_map,
-            constraints=self.constraints
+        # serve the entry generated speculatively since the last write, waiting for it if it is still running
+        speculation = self.take_speculation()
+        if speculation is not None:
+            entry = speculation.result()
+            return CompactEntry.from_entry(entry) if compact else entry
+        return self.snapshot.generate_entry(compact)
+
+    def can_use_rotation_schedule(self):
+        """
+        Check if the next entry can be taken from the rotation schedule.
+
+        :return: True if the rotation schedule can be used, False otherwise
+        """
+        return self.snapshot.can_use_rotation_schedule()
+
+    def create_rotation_schedule(
+        self, person_ids: frozenset, group_sizes: dict, constraints: tuple, history_index: HistoryIndex,
+        shared_index: SharedHistoryIndex=None
+    ):
+        """
+        Create the rotation schedule for a roster, groups and constraints,
+        if the history is still empty and not shared, there are no constraints and the groups have the same size,
+        and if the schedule has at least 2 rounds without repeated pairings.
+
+        :param person_ids: the set of person IDs
+        :param group_sizes: the dictionary of group capacities
+        :param constraints: the constraints
+        :param history_index: the index of the past pairings
+        :param shared_index: the index of the past pairings shared with other projects (if any)
+        :return: the rotation schedule, or None if it cannot be used
+        """
+        # the schedule ignores the pairings of the other projects
+        if history_index.entry_count or shared_index is not None \
+                or not RotationSchedule.is_applicable(group_sizes, constraints):
+            return None
+        rotation_schedule = RotationSchedule(person_ids, group_sizes)
+        # a single round is not worth leaving the regular generation
+        if rotation_schedule.round_count < 2:
+            return None
+        return rotation_schedule
+
+    def reset_rotation_schedule(self, person_ids: frozenset, group_sizes: dict, constraints: tuple):
+        """
+        Get the changes of the rotation schedule after a change of the roster, the groups or the constraints.
+        A new schedule can only be created if the history is still empty.
+
+        :param person_ids: the new set of person IDs
+        :param group_sizes: the new dictionary of group capacities
+        :param constraints: the new constraints
+        :return: the changes of the snapshot
+        """
+        rotation_schedule = self.create_rotation_schedule(
+            person_ids, group_sizes, constraints, self.snapshot.history_index, self.snapshot.shared_index
         )
-        return generator.generate_entry()
+        return {'rotation_schedule': rotation_schedule, 'rotation_round': 0}
+
+    def generate_best_entry(self, attempts: int, compact: bool=False):
+        """
+        Generate several possible entries and keep the one with the lowest redundancy.
+        The attempts stop early if an entry reaches the redundancy lower bound.
+
+        :param attempts: the number of entries to generate
+        :param compact: whether to return a compact entry instead of a dictionary of sets
+        :return: the best entry
+        """
+        return self.snapshot.generate_best_entry(attempts, compact)
+
+    def repair_entry(self, entry: dict, added: set=None, removed: set=None):
+        """
+        Repair a previously announced entry after last-minute roster changes.
+        The roster itself is not changed.
+
+        :param entry: the announced entry
+        :param added: the set of IDs of the persons to add
+        :param removed: the set of IDs of the persons to remove
+        :return: the repaired entry
+        """
+        return self.snapshot.repair_entry(entry, added, removed)
+
+    def get_entry_redundancy(self, entry: dict):
+        """
+        Get the redundancy of an entry, i.e. the number of past occurrences
+        of all the person-person pairings it contains.
+
+        :param entry: the entry to score
+        :return: the redundancy of the entry
+        """
+        return self.snapshot.get_entry_redundancy(entry)
+
+    def get_redundancy_lower_bound(self):
+        """
+        Get a lower bound on the redundancy of any entry satisfying the 'together' constraints
+        for the current persons, groups and history.
+
+        :return: the lower bound
+        """
+        return self.snapshot.get_redundancy_lower_bound()
+
+    def get_optimality_gap(self, entry: dict):
+        """
+        Get the gap between the redundancy of an entry and the redundancy lower bound.
+        A null gap proves that the entry is optimal.
+
+        :param entry: the entry to score
+        :return: the optimality gap
+        """
+        return self.snapshot.get_optimality_gap(entry)
+
+    def validate_history(self):
+        """
+        Validate the whole history against the current roster and groups.
+        Unknown persons and groups, as well as groups over their current capacity,
+        are legitimate after changes of the roster or the groups, so they are only reported.
+
+        :return: the dictionary giving, for each kind of problem,
+        the sorted list of the indices of the offending entries
+        """
+        with self.write_lock:
+            return validate_history(self.history, self.person_ids, self.group_sizes)
+
+    # ------------------------ ASYNC ------------------------ #
+
+    async def agenerate_entry(self, executor=None):
+        """
+        Generate a new possible entry in an executor, without blocking the event loop.
+        Concurrent calls share a single preparation of the occurrences maps,
+        and the generations run on a snapshot, without waiting for the saves.
+
+        :param executor: the executor running the generation (the default executor of the loop if None)
+        :return: a new entry
+        """
+        import asyncio
+        # serve the entry generated speculatively since the last write, like generate_entry
+        speculation = self.take_speculation()
+        if speculation is not None:
+            return await asyncio.wrap_future(speculation)
+        loop = asyncio.get_running_loop()
+        # wait for the preparation of the maps by a concurrent call
+        async with self.get_async_lock():
+            snapshot = self.snapshot
+            if snapshot.needs_occurrences_maps() and not snapshot.has_current_occurrences_maps():
+                await loop.run_in_executor(executor, snapshot.get_occurrences_maps)
+        return await loop.run_in_executor(executor, snapshot.generate_entry)
+
+    async def asave_entry(self, entry: dict, executor=None):
+        """
+        Save the entry in the history in an executor, without blocking the event loop.
+        The saves of a project are serialized, the running generations keep their snapshot.
+
+        :param entry: the entry to save
+        :param executor: the executor running the save (the default executor of the loop if None)
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        async with self.get_async_lock():
+            await loop.run_in_executor(executor, self.save_entry, entry)
+
+    def get_async_lock(self):
+        if self.async_lock is None:
+            import asyncio
+            self.async_lock = asyncio.Lock()
+        return self.async_lock
 
     # ------------------------ GUARDS ------------------------ #
 
@@ -117,18 +373,23 @@ class MemoMix:
         assert len(person_ids) <= sum(group_sizes.values()), \
             'The groups cannot contain all the persons.'
 
-    def check_constraints_validity(self, constraints: list):
+    def check_constraints_validity(self, constraints: list, person_ids: set=None, group_sizes: dict=None):
         """
         Check that the constraints are valid.
 
         :param constraints: the constraints to check
+        :param person_ids: the set of person IDs (the current ones if None)
+        :param group_sizes: the dictionary of group capacities (the current ones if None)
         :return: True if the constraints are valid, False otherwise
         """
-        group_ids = set(self.group_sizes.keys())
+        if person_ids is None:
+            person_ids = self.person_ids
+        if group_sizes is None:
+            group_sizes = self.group_sizes
+        group_ids = set(group_sizes.keys())
         for index, constraint in enumerate(constraints):
-            person_ids = constraint['persons']
-            for person_id in person_ids:
-                assert person_id in self.person_ids, \
+            for person_id in constraint['persons']:
+                assert person_id in person_ids, \
                     f"The person '{person_id}' in constraint #{index} does not exist."
             mandatory_group_id = constraint.get('mandatoryGroup')
             forbidden_group_ids = constraint.get('forbiddenGroups')
@@ -140,6 +401,19 @@ class MemoMix:
                     assert forbidden_group_id in group_ids, \
                         f"The forbidden group '{forbidden_group_id}' in constraint #{index+1} does not exist."
 
+    def check_history_validity(self, history: list):
+        """
+        Check that all person IDs appear only once in each entry of the history,
+        reporting all the invalid entries at once.
+
+        :param history: the history to check
+        :return: True if the history is valid, False otherwise
+        """
+        duplicate_entry_indices = get_duplicate_person_entry_indices(history)
+        assert not duplicate_entry_indices, \
+            f"Some persons appear more than once in the entries #{duplicate_entry_indices} of the history."
+        return True
+
     def check_entry_validity(self, entry: dict):
         """
         Check that all person IDs appear only once in the entry.
@@ -147,12 +421,12 @@ class MemoMix:
         :param entry: the entry to check
         :return: True if the entry is valid, False otherwise
         """
+        _, member_ids, _ = CompactEntry.get_entry_members(entry)
         used_person_ids = set()
-        for group in entry.values():
-            for person_id in group:
-                assert person_id not in used_person_ids, \
-                    f"The person '{person_id}' appears more than once in the entry."
-                used_person_ids.add(person_id)
+        for person_id in member_ids:
+            assert person_id not in used_person_ids, \
+                f"The person '{person_id}' appears more than once in the entry."
+            used_person_ids.add(person_id)
         return True
     
     # ------------------------ SETTERS ------------------------ #
@@ -163,8 +437,13 @@ class MemoMix:
 
         :param person_ids: the new set
         """
-        self.check_sufficient_group_sizes(person_ids)
-        self.person_ids = person_ids
+        with self.write_lock:
+            self.check_sufficient_group_sizes(person_ids)
+            person_ids = frozenset(person_ids)
+            self.publish(
+                person_ids=person_ids, occurrences_maps=None,
+                **self.reset_rotation_schedule(person_ids, self.group_sizes, self.constraints)
+            )
 
     def set_group_sizes(self, group_sizes: dict):
         """
@@ -172,9 +451,14 @@ class MemoMix:
 
         :param group_sizes: the new dictionary
         """
-        self.check_positive_group_sizes(group_sizes) 
-        self.check_sufficient_group_sizes(group_sizes=group_sizes)
-        self.group_sizes = group_sizes
+        with self.write_lock:
+            self.check_positive_group_sizes(group_sizes)
+            self.check_sufficient_group_sizes(group_sizes=group_sizes)
+            group_sizes = dict(group_sizes)
+            self.publish(
+                group_sizes=group_sizes, occurrences_maps=None,
+                **self.reset_rotation_schedule(self.person_ids, group_sizes, self.constraints)
+            )
 
     def set_constraints(self, constraints: list):
         """
@@ -182,9 +466,16 @@ class MemoMix:
 
         :param constraints: the new constraints
         """
-        self.check_constraints_validity(together_constraints, apart_constraints)
-        self.constraints = constraints
-    
+        with self.write_lock:
+            self.check_constraints_validity(constraints)
+            constraints = tuple(constraints)
+            # the maps do not depend on the constraints
+            occurrences_maps, shared_version = self.snapshot.get_prepared_maps()
+            self.publish(
+                constraints=constraints, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(self.person_ids, self.group_sizes, constraints)
+            )
+
     def save_entry(self, entry: dict):
         """
         Save the entry in the history.
@@ -192,4 +483,264 @@ class MemoMix:
         :param entry: the entry to save
         """
         self.check_entry_validity(entry)
-        self.history.append(entry)
+        with self.write_lock:
+            snapshot = self.snapshot
+            history_index = HistoryIndex(checkpoint=snapshot.history_index)
+            history_index.add_entry(entry)
+            changes = {'history_index': history_index}
+            # keep using the rotation schedule while the saved entries are its rounds
+            if snapshot.can_use_rotation_schedule():
+                scheduled_entry = snapshot.rotation_schedule.get_entry(snapshot.rotation_round)
+                if {group_id: set(group) for group_id, group in entry.items() if group} \
+                        == {group_id: group for group_id, group in scheduled_entry.items() if group}:
+                    changes['rotation_round'] = snapshot.rotation_round + 1
+                else:
+                    changes['rotation_schedule'] = None
+            else:
+                changes['rotation_schedule'] = None
+            pairing_index = history_index
+            # a single read of the maps: they can still be prepared on the old snapshot by a concurrent reader,
+            # and they must not be carried over without the new entry
+            occurrences_maps, maps_shared_version = snapshot.get_prepared_maps()
+            patch_maps = occurrences_maps is not None
+            if snapshot.shared_index is not None:
+                shared_version = snapshot.shared_index.add_entry(
+                    snapshot.shared_project_id, entry, snapshot.history_index, history_index
+                )
+                pairing_index = CombinedHistoryIndex(
+                    history_index, snapshot.shared_index, snapshot.shared_project_id, snapshot.shared_weight
+                )
+                # the maps can only be patched if no other project saved an entry since they were prepared
+                patch_maps = patch_maps and maps_shared_version == shared_version - 1
+                maps_shared_version = shared_version
+            if patch_maps:
+                changes['occurrences_maps'] = self.patch_occurrences_maps(
+                    tuple(occurrences_map.copy() for occurrences_map in occurrences_maps), pairing_index, entry
+                )
+                changes['shared_version'] = maps_shared_version
+            if snapshot.partner_candidates is not None:
+                partner_candidates = snapshot.partner_candidates.copy(pairing_index)
+                partner_candidates.refresh(entry, list(snapshot.person_ids))
+                changes['partner_candidates'] = partner_candidates
+            self.history.append(entry)
+            self.publish(**changes)
+            if self.history_limit is not None and len(self.history) > self.history_limit:
+                self.compact_history(self.history_limit)
+
+    def detach_shared_index(self):
+        """
+        Remove the tallies of the project from the shared index, which is no longer used by the project.
+        Nothing is removed if another instance registered the project ID since.
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            if snapshot.shared_index is None:
+                return
+            snapshot.shared_index.detach(snapshot.shared_project_id, snapshot.history_index)
+            changes = {}
+            if snapshot.partner_candidates is not None:
+                changes['partner_candidates'] = snapshot.partner_candidates.copy(snapshot.history_index)
+            self.publish(
+                shared_index=None, shared_project_id=None, shared_version=None, occurrences_maps=None,
+                **changes
+            )
+
+    def compact_history(self, keep_last: int):
+        """
+        Fold the older entries of the history into the checkpoint,
+        keeping only the most recent ones as raw entries.
+        The past pairings, hence the generated entries, are unchanged.
+
+        :param keep_last: the number of recent entries to keep
+        """
+        assert keep_last >= 0, 'The number of entries to keep is negative.'
+        with self.write_lock:
+            # the history index already counts all the entries, they only have to be dropped
+            del self.history[:max(0, len(self.history) - keep_last)]
+
+    def get_checkpoint(self):
+        """
+        Get the index of the entries that were folded out of the history.
+
+        :return: the checkpoint
+        """
+        with self.write_lock:
+            checkpoint = HistoryIndex(checkpoint=self.history_index)
+            for entry in self.history:
+                checkpoint.remove_entry(entry)
+        return checkpoint
+
+    def copy_occurrences_maps(self):
+        """
+        Get copies of the prepared occurrences maps, to be changed for the next snapshot.
+        The copies share the base of the layered maps, so their cost is proportional to the changes since the last fold.
+        The records of the maps are shared, so they must be replaced instead of modified.
+
+        :return: the 3 layered dictionaries (or None if the maps are not prepared)
+        and the version of the shared index they were prepared at
+        """
+        occurrences_maps, shared_version = self.snapshot.get_prepared_maps()
+        if occurrences_maps is None:
+            return None, None
+        return tuple(occurrences_map.copy() for occurrences_map in occurrences_maps), shared_version
+
+    def patch_occurrences_maps(self, occurrences_maps: tuple, history_index: HistoryIndex, entry: dict):
+        """
+        Add the pairings of a new entry to copies of the prepared occurrences maps.
+
+        :param occurrences_maps: the copies of the 3 dictionaries
+
+        :param history_index: the index of the past pairings (or a combined view of the shared pairings),
+        including the new entry
+        :param entry: the new entry
+        :return: the 3 dictionaries
+        """
+        pairing_counts_map, person_occurrences_map, group_occurrences_map = occurrences_maps
+        for group_id, group in entry.items():
+            group = [person_id for person_id in group if person_id in self.person_ids]
+            for idx, person1_id in enumerate(group):
+                pairing_counts_map[person1_id] = history_index.get_pairing_count(person1_id)
+                for person2_id in group[idx + 1:]:
+                    key = get_person_person_key(person1_id, person2_id)
+                    person_occurrence = person_occurrences_map[key]
+                    person_occurrences_map[key] = {**person_occurrence, 'count': person_occurrence['count'] + 1}
+                if group_id in self.group_sizes:
+                    key = get_person_group_key(person1_id, group_id)
+                    group_occurrence = group_occurrences_map[key]
+                    group_occurrences_map[key] = {**group_occurrence, 'count': group_occurrence['count'] + 1}
+        return occurrences_maps
+
+    # ------------------------ DELTAS ------------------------ #
+
+    def add_persons(self, person_ids: set):
+        """
+        Add persons to the roster, carrying over the prepared occurrences maps.
+        The past pairings of persons who were already in the history are restored.
+
+        :param person_ids: the set of IDs of the persons to add
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            new_person_ids = set(person_ids) - snapshot.person_ids
+            self.check_sufficient_group_sizes(snapshot.person_ids | new_person_ids)
+            occurrences_maps, shared_version = self.copy_occurrences_maps()
+            if occurrences_maps is not None:
+                pairing_counts_map, person_occurrences_map, group_occurrences_map = occurrences_maps
+                inserted_person_ids = list(snapshot.person_ids)
+                for person1_id in new_person_ids:
+                    pairing_counts_map[person1_id] = snapshot.get_pairing_index().get_pairing_count(person1_id)
+                    for person2_id in inserted_person_ids:
+                        snapshot.add_person_occurrence(person_occurrences_map, person1_id, person2_id)
+                    for group_id in snapshot.group_sizes:
+                        snapshot.add_group_occurrence(group_occurrences_map, person1_id, group_id)
+                    inserted_person_ids.append(person1_id)
+            new_person_ids = snapshot.person_ids | new_person_ids
+            self.publish(
+                person_ids=new_person_ids, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(new_person_ids, snapshot.group_sizes, snapshot.constraints)
+            )
+
+    def remove_persons(self, person_ids: set):
+        """
+        Remove persons from the roster, carrying over the prepared occurrences maps.
+        Their past pairings are kept in the history.
+
+        :param person_ids: the set of IDs of the persons to remove
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            removed_person_ids = set(person_ids) & snapshot.person_ids
+            for index, constraint in enumerate(snapshot.constraints):
+                assert not removed_person_ids & set(constraint['persons']), \
+                    f"A removed person is used in constraint #{index+1}."
+            new_person_ids = snapshot.person_ids - removed_person_ids
+            occurrences_maps, shared_version = self.copy_occurrences_maps()
+            if occurrences_maps is not None:
+                pairing_counts_map, person_occurrences_map, group_occurrences_map = occurrences_maps
+                remaining_person_ids = list(new_person_ids)
+                for person1_id in removed_person_ids:
+                    del pairing_counts_map[person1_id]
+                    for person2_id in remaining_person_ids:
+                        del person_occurrences_map[get_person_person_key(person1_id, person2_id)]
+                    for group_id in snapshot.group_sizes:
+                        del group_occurrences_map[get_person_group_key(person1_id, group_id)]
+                    remaining_person_ids.append(person1_id)
+            self.publish(
+                person_ids=new_person_ids, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(new_person_ids, snapshot.group_sizes, snapshot.constraints)
+            )
+
+    def resize_groups(self, group_sizes: dict):
+        """
+        Change the capacities of some existing groups.
+
+        :param group_sizes: the dictionary of new capacities of the groups to resize
+        """
+        with self.write_lock:
+            for group_id in group_sizes:
+                assert group_id in self.group_sizes, f"The group '{group_id}' does not exist."
+            self.check_positive_group_sizes(group_sizes)
+            new_group_sizes = {**self.group_sizes, **group_sizes}
+            self.check_sufficient_group_sizes(group_sizes=new_group_sizes)
+            # the maps do not depend on the capacities
+            occurrences_maps, shared_version = self.snapshot.get_prepared_maps()
+            self.publish(
+                group_sizes=new_group_sizes, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(self.person_ids, new_group_sizes, self.constraints)
+            )
+
+    def add_groups(self, group_sizes: dict):
+        """
+        Add groups, carrying over the prepared occurrences maps.
+        The past pairings with groups that were already in the history are restored.
+
+        :param group_sizes: the dictionary of capacities of the groups to add
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            for group_id in group_sizes:
+                assert group_id not in snapshot.group_sizes, f"The group '{group_id}' already exists."
+            self.check_positive_group_sizes(group_sizes)
+            occurrences_maps, shared_version = self.copy_occurrences_maps()
+            if occurrences_maps is not None:
+                group_occurrences_map = occurrences_maps[2]
+                for person_id in snapshot.person_ids:
+                    for group_id in group_sizes:
+                        snapshot.add_group_occurrence(group_occurrences_map, person_id, group_id)
+            new_group_sizes = {**snapshot.group_sizes, **group_sizes}
+            self.publish(
+                group_sizes=new_group_sizes, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(snapshot.person_ids, new_group_sizes, snapshot.constraints)
+            )
+
+    def remove_groups(self, group_ids: set):
+        """
+        Remove groups, carrying over the prepared occurrences maps.
+        Their past pairings are kept in the history.
+
+        :param group_ids: the set of IDs of the groups to remove
+        """
+        with self.write_lock:
+            snapshot = self.snapshot
+            for group_id in group_ids:
+                assert group_id in snapshot.group_sizes, f"The group '{group_id}' does not exist."
+            for index, constraint in enumerate(snapshot.constraints):
+                used_group_ids = set(constraint.get('forbiddenGroups') or set())
+                used_group_ids.add(constraint.get('mandatoryGroup'))
+                assert not used_group_ids & set(group_ids), \
+                    f"A removed group is used in constraint #{index+1}."
+            new_group_sizes = {
+                group_id: size for group_id, size in snapshot.group_sizes.items()
+                if group_id not in group_ids
+            }
+            self.check_sufficient_group_sizes(group_sizes=new_group_sizes)
+            occurrences_maps, shared_version = self.copy_occurrences_maps()
+            if occurrences_maps is not None:
+                group_occurrences_map = occurrences_maps[2]
+                for person_id in snapshot.person_ids:
+                    for group_id in group_ids:
+                        del group_occurrences_map[get_person_group_key(person_id, group_id)]
+            self.publish(
+                group_sizes=new_group_sizes, occurrences_maps=occurrences_maps, shared_version=shared_version,
+                **self.reset_rotation_schedule(snapshot.person_ids, new_group_sizes, snapshot.constraints)
+            )
@@ -0,0 +1,119 @@
+from .compact_entry import CompactEntry
+from .history_index import HistoryIndex
+from .history_validator import validate_history
+from .memomix import MemoMix
+
+# Conversions between the JSON objects of a project and the Python structures used by MemoMix:
+# {'persons': [...], 'groupSizes': {...}, 'history': [{...}, ...], 'constraints': [{...}, ...], 'checkpoint': {...}}
+# where the optional checkpoint holds the tallies of the entries folded out of the history
+
+def import_persons(persons_array: list):
+    return set(persons_array)
+
+def import_group_sizes(group_sizes_object: dict):
+    return dict(group_sizes_object)
+
+def import_history(history_array: list):
+    return [import_entry(entry_object) for entry_object in history_array]
+
+def import_entry(entry_object: dict):
+    return {group_id: set(group) for group_id, group in entry_object.items()}
+
+def import_constraints(constraint_objects_array: list):
+    constraints = []
+    for constraint_object in constraint_objects_array:
+        constraint = {
+            'type': constraint_object['type'],
+            'persons': set(constraint_object['persons'])
+        }
+        if 'mandatoryGroup' in constraint_object:
+            constraint['mandatoryGroup'] = constraint_object['mandatoryGroup']
+        if 'forbiddenGroups' in constraint_object:
+            constraint['forbiddenGroups'] = set(constraint_object['forbiddenGroups'])
+        constraints.append(constraint)
+    return constraints
+
+def import_checkpoint(checkpoint_object: dict):
+    return HistoryIndex.from_object(checkpoint_object)
+
+def import_project(project_object: dict, **options):
+    """
+    Build a MemoMix instance from the JSON object of a project.
+
+    :param project_object: the project object
+    :param options: the other parameters of the MemoMix constructor
+    :return: the MemoMix instance
+    """
+    return MemoMix(
+        persons=import_persons(project_object['persons']),
+        group_sizes=import_group_sizes(project_object['groupSizes']),
+        history=import_history(project_object.get('history', [])),
+        constraints=import_constraints(project_object.get('constraints', [])),
+        checkpoint=import_checkpoint(project_object['checkpoint']) if 'checkpoint' in project_object else None,
+        **options
+    )
+
+def validate_project(project_object: dict):
+    """
+    Validate the whole history of the JSON object of a project before importing it,
+    including the persons repeated within a group, which the import of the groups as sets would hide.
+
+    :param project_object: the project object
+    :return: the dictionary giving, for each kind of problem ('duplicatePersons', 'unknownPersons',
+    'unknownGroups', 'overCapacityGroups'), the sorted list of the indices of the offending entries
+    """
+    return validate_history(
+        history=project_object.get('history', []),
+        person_ids=import_persons(project_object['persons']),
+        group_sizes=import_group_sizes(project_object['groupSizes'])
+    )
+
+def export_person_ids(person_ids: set):
+    return list(person_ids)
+
+def export_group_sizes(group_sizes: dict):
+    return dict(group_sizes)
+
+def export_history(history: list):
+    return [export_entry(entry) for entry in history]
+
+def export_entry(entry: dict):
+    # the groups of a compact entry are already iterated as new lists
+    if isinstance(entry, CompactEntry):
+        return dict(entry.items())
+    return {group_id: list(group) for group_id, group in entry.items()}
+
+def export_constraints(constraints: list):
+    constraint_objects_array = []
+    for constraint in constraints:
+        constraint_object = {
+            'type': constraint['type'],
+            'persons': list(constraint['persons'])
+        }
+        if 'mandatoryGroup' in constraint:
+            constraint_object['mandatoryGroup'] = constraint['mandatoryGroup']
+        if 'forbiddenGroups' in constraint:
+            constraint_object['forbiddenGroups'] = list(constraint['forbiddenGroups'])
+        constraint_objects_array.append(constraint_object)
+    return constraint_objects_array
+
+def export_checkpoint(checkpoint: HistoryIndex):
+    return checkpoint.to_object()
+
+def export_project(mm: MemoMix):
+    """
+    Get the JSON object of the project of a MemoMix instance.
+
+    :param mm: the MemoMix instance
+    :return: the project object
+    """
+    project_object = {
+        'persons': export_person_ids(mm.person_ids),
+        'groupSizes': export_group_sizes(mm.group_sizes),
+        'history': export_history(mm.history),
+        'constraints': export_constraints(mm.constraints)
+    }
+    # if entries were folded out of the history
+    if mm.history_index.entry_count > len(mm.history):
+        project_object['checkpoint'] = export_checkpoint(mm.get_checkpoint())
+    return project_object
@@ -0,0 +1,114 @@
+from .util import random_shuffle
+
+class RotationSchedule:
+    """
+    Combinatorial schedule of rounds for a history-free project without constraints
+    whose groups all have the same size.
+
+    The groups of 2 are scheduled with the circle method: one person stays in place while the others
+    rotate around a circle, and the facing persons are paired, so every pairing occurs once
+    in the number of persons minus 1 rounds (one more with an odd number of persons).
+
+    The larger groups are scheduled with an affine construction: the persons are laid out on a grid
+    with one row per group and one column per seat. In round r, the person in row i and column c goes
+    to the group (i + r * (c + shift)) % group_count: 2 persons of different columns meet again only when
+    r times the difference of their columns is a multiple of the number of groups, so the first rounds
+    never repeat a pairing. There are as many rounds as groups when the number of groups is prime
+    and at least the number of columns. Otherwise, there are fewer: the first round r such that r times
+    a column difference is a multiple of the number of groups repeats a pairing, so there is a single
+    round when there are more columns than groups.
+    """
+    def __init__(self, person_ids: set, group_sizes: dict):
+        """
+        Constructor.
+
+        :param person_ids: the set of person IDs
+        :param group_sizes: the dictionary of group capacities, which must all be equal
+        """
+        self.group_id_list = list(group_sizes)
+        group_count = len(self.group_id_list)
+        self.group_size = group_sizes[self.group_id_list[0]]
+        assert all(size == self.group_size for size in group_sizes.values()), 'The groups do not have the same size.'
+        self.person_id_list = random_shuffle(person_ids)
+
+        if self.group_size == 2:
+            # an odd number of persons is completed by an empty seat, whose partner is alone in the round
+            if len(self.person_id_list) % 2:
+                self.person_id_list.append(None)
+            self.round_count = max(len(self.person_id_list) - 1, 0)
+            return
+
+        # the persons are laid out column by column, so that the empty seats are in the last columns
+        # and the groups never differ by more than one person
+        self.seats = [
+            (idx % group_count, idx // group_count)
+            for idx in range(len(person_ids))
+        ]
+        column_count = -(-len(person_ids) // group_count)
+
+        # the number of rounds without repeated person-person pairings
+        self.round_count = self.get_round_count(group_count, max_column_gap=column_count - 1)
+        # shift the columns to also avoid repeated person-group pairings, if it costs no round
+        self.shift = 1 if self.get_round_count(group_count, max_column_gap=column_count) == self.round_count else 0
+
+    @staticmethod
+    def is_applicable(group_sizes: dict, constraints):
+        """
+        Check if a schedule can be used for the groups and constraints,
+        i.e. if there are no constraints and at least 2 groups of the same size of at least 2.
+
+        :param group_sizes: the dictionary of group capacities
+        :param constraints: the list of constraints
+        :return: True if a schedule can be used, False otherwise
+        """
+        if constraints or len(group_sizes) < 2:
+            return False
+        return len(set(group_sizes.values())) == 1 and next(iter(group_sizes.values())) >= 2
+
+    @staticmethod
+    def get_round_count(group_count: int, max_column_gap: int):
+        # a difference of rounds multiple of the number of groups always repeats the pairings
+        round_count = 1
+        while round_count < group_count and all(
+            round_count * column_gap % group_count
+            for column_gap in range(1, max_column_gap + 1)
+        ):
+            round_count += 1
+        return round_count
+
+    def get_entry(self, round_idx: int):
+        """
+        Get the entry of a round of the schedule.
+
+        :param round_idx: the index of the round
+        :return: the entry
+        """
+        if self.group_size == 2:
+            return self.get_pair_entry(round_idx)
+        group_count = len(self.group_id_list)
+        entry = {group_id: set() for group_id in self.group_id_list}
+        for person_id, (row, column) in zip(self.person_id_list, self.seats):
+            group_idx = (row + round_idx * (column + self.shift)) % group_count
+            entry[self.group_id_list[group_idx]].add(person_id)
+        return entry
+
+    def get_pair_entry(self, round_idx: int):
+        """
+        Get the entry of a round of the circle method, for groups of 2.
+
+        :param round_idx: the index of the round
+        :return: the entry
+        """
+        group_count = len(self.group_id_list)
+        entry = {group_id: set() for group_id in self.group_id_list}
+        # the first person stays in place, the others rotate by one position per round
+        others = self.person_id_list[1:]
+        shift = round_idx % len(others)
+        circle = self.person_id_list[:1] + others[shift:] + others[:shift]
+        for pair_idx in range(len(circle) // 2):
+            # the pairs also rotate over the groups, to avoid repeated person-group pairings
+            group_id = self.group_id_list[(pair_idx + round_idx) % group_count]
+            entry[group_id].update(
+                person_id for person_id in (circle[pair_idx], circle[-1 - pair_idx]) if person_id is not None
+            )
+        return entry
@@ -0,0 +1,194 @@
+import threading
+
+from .history_index import HistoryIndex
+
+class SharedHistoryIndex:
+    """
+    Running tallies of the past person-person pairings of several projects whose rosters overlap
+    (e.g. the lunch tables, the squads and the workshops of the same employees).
+
+    Each project is registered under its ID with the tallies of its history, then its saved entries
+    are added incrementally. A project reads the pairings of the other ones by subtracting its registered
+    tallies from the totals, without copying or replaying any history.
+    Registering a project ID again replaces its tallies instead of adding them twice.
+    The person-group pairings are not shared, since the groups are specific to each project.
+
+    The state is replaced as a whole by each write, like the snapshots of MemoMix, so that the readers
+    get the totals and the tallies of the projects at the same version, without locks.
+    """
+    def __init__(self):
+        """
+        Constructor.
+        """
+        # the version, the index of the tallies of all the projects,
+        # and the dictionary giving for each project ID the index of its registered tallies
+        self.state = (0, HistoryIndex(), {})
+        # the lock serializing the writes of the projects
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # the copies sent to worker processes are frozen, they do not need the lock
+        state = dict(self.__dict__)
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.state[0]
+
+    def get_state(self):
+        """
+        Get the current state. It is never modified by the later writes.
+
+        :return: the version, the index of all the tallies and the dictionary of the indices of the projects
+        """
+        return self.state
+
+    def attach(self, project_id: str, history_index: HistoryIndex):
+        """
+        Register the tallies of a project, replacing the ones previously registered under its ID.
+
+        :param project_id: the ID of the project
+        :param history_index: the index of the past pairings of the project
+        :return: the version of the shared index after the change
+        """
+        with self.lock:
+            version, index, project_indices = self.state
+            index = HistoryIndex(checkpoint=index)
+            previous_index = project_indices.get(project_id)
+            if previous_index is not None:
+                index.add_index(previous_index, weight=-1, with_groups=False)
+            index.add_index(history_index, with_groups=False)
+            self.state = (version + 1, index, {**project_indices, project_id: history_index})
+            return version + 1
+
+    def detach(self, project_id: str, history_index: HistoryIndex):
+        """
+        Remove the tallies of a project, if they are still the ones it registered.
+
+        :param project_id: the ID of the project
+        :param history_index: the index of the past pairings the project registered last
+        :return: the version of the shared index after the change
+        """
+        with self.lock:
+            version, index, project_indices = self.state
+            # the project ID was registered again by another instance, which owns it now
+            if project_indices.get(project_id) is not history_index:
+                return version
+            index = HistoryIndex(checkpoint=index)
+            index.add_index(history_index, weight=-1, with_groups=False)
+            project_indices = dict(project_indices)
+            del project_indices[project_id]
+            self.state = (version + 1, index, project_indices)
+            return version + 1
+
+    def add_entry(self, project_id: str, entry: dict, previous_index: HistoryIndex, history_index: HistoryIndex):
+        """
+        Add the person-person pairings of an entry saved by a project.
+
+        :param project_id: the ID of the project
+        :param entry: the entry to add
+        :param previous_index: the index of the past pairings the project registered last
+        :param history_index: the index of the past pairings of the project, including the entry
+        :return: the version of the shared index after the change
+        """
+        with self.lock:
+            version, index, project_indices = self.state
+            assert project_indices.get(project_id) is previous_index, \
+                f"The project '{project_id}' is not attached to the shared index by this instance."
+            index = HistoryIndex(checkpoint=index)
+            index.add_entry(entry, with_groups=False)
+            self.state = (version + 1, index, {**project_indices, project_id: history_index})
+            return version + 1
+
+class CombinedHistoryIndex:
+    """
+    Read-only view of the past pairings of a project: its own tallies, plus the tallies
+    of the other projects of a shared index scaled by the weight of the project.
+    It has the same getters as a history index, and the counts are looked up on the fly
+    in the state of the shared index taken when the view is created.
+    """
+    def __init__(
+        self, history_index: HistoryIndex, shared_index: SharedHistoryIndex, project_id: str, weight: float
+    ):
+        """
+        Constructor.
+
+        :param history_index: the index of the past pairings of the project
+        :param shared_index: the index of the past pairings of all the projects
+        :param project_id: the ID of the project in the shared index
+        :param weight: the weight of the pairings of the other projects
+        """
+        self.history_index = history_index
+        self.weight = weight
+        _, self.shared_counts, project_indices = shared_index.get_state()
+        # the tallies of the project in the shared index, which can be more recent than the history index
+        self.project_counts = project_indices.get(project_id) or HistoryIndex()
+
+    @staticmethod
+    def combine(
+        history_index: HistoryIndex, shared_index: SharedHistoryIndex=None, project_id: str=None, weight: float=1
+    ):
+        """
+        Get the index from which the past pairings of a project are read.
+
+        :param history_index: the index of the past pairings of the project
+        :param shared_index: the index of the past pairings of all the projects (if any)
+        :param project_id: the ID of the project in the shared index
+        :param weight: the weight of the pairings of the other projects
+        :return: the history index itself if there is no shared index, the combined view otherwise
+        """
+        if shared_index is None:
+            return history_index
+        return CombinedHistoryIndex(history_index, shared_index, project_id, weight)
+
+    def get_pairing_count(self, person_id: str):
+        """
+        Get the weighted number of past pairings of a person with other persons.
+
+        :param person_id: the ID of the person
+        :return: the number of past pairings
+        """
+        other_count = self.shared_counts.get_pairing_count(person_id) \
+            - self.project_counts.get_pairing_count(person_id)
+        return self.history_index.get_pairing_count(person_id) + self.weight * other_count
+
+    def get_person_count(self, person1_id: str, person2_id: str):
+        """
+        Get the weighted number of past occurrences of 2 persons together.
+
+        :param person1_id: the ID of the first person
+        :param person2_id: the ID of the second person
+        :return: the number of past occurrences
+        """
+        other_count = self.shared_counts.get_person_count(person1_id, person2_id) \
+            - self.project_counts.get_person_count(person1_id, person2_id)
+        return self.history_index.get_person_count(person1_id, person2_id) + self.weight * other_count
+
+    def get_group_count(self, person_id: str, group_id: str):
+        """
+        Get the number of past occurrences of a person in a group of the project.
+
+        :param person_id: the ID of the person
+        :param group_id: the ID of the group
+        :return: the number of past occurrences
+        """
+        return self.history_index.get_group_count(person_id, group_id)
+
+    def get_person_count_items(self):
+        """
+        Get the non-null weighted past occurrences of the person-person pairings.
+        The pairings of the project are included in the shared ones, so only the latter are iterated.
+
+        :return: the iterator of (person-person key, count) pairs
+        """
+        local_counts = self.history_index.person_counts
+        project_counts = self.project_counts.person_counts
+        for key, shared_count in self.shared_counts.get_person_count_items():
+            count = local_counts.get(key, 0) + self.weight * (shared_count - project_counts.get(key, 0))
+            if count:
+                yield key, count
@@ -0,0 +1,336 @@
+import copy
+
+from .compact_entry import CompactEntry
+from .entry_generator import EntryGenerator
+from .history_index import HistoryIndex
+from .layered_dict import LayeredDict
+from .rotation_schedule import RotationSchedule
+from .shared_history_index import SharedHistoryIndex, CombinedHistoryIndex
+from .util import get_person_person_key, get_person_group_key
+
+class MemoMixSnapshot:
+    """
+    Read-only version of the state of a MemoMix instance, from which entries are generated.
+
+    A published snapshot is never modified: the writes of MemoMix publish a new version instead.
+    Hence, a snapshot can be read by any number of threads without locks,
+    or be pickled and sent to worker processes.
+    Only the occurrences maps are cached lazily: concurrent readers may prepare them twice, which is harmless,
+    but they may also be prepared on a version after a writer read it. Hence, the writes only carry the maps over
+    to the next version when they pass them explicitly, from a single read of the cache.
+    With a shared index, the pairings of the project are the ones of the snapshot, but the pairings
+    of the other projects are read from the current state of the shared index, so a snapshot sees their saves.
+    """
+    def __init__(
+        self, version: int, person_ids: frozenset, group_sizes: dict, constraints: tuple,
+        history_index: HistoryIndex, occurrences_maps: tuple=None,
+        rotation_schedule: RotationSchedule=None, rotation_round: int=0,
+        approximation_width: int=None, partner_candidates=None,
+        prioritize_groups: bool=False, shared_index: SharedHistoryIndex=None,
+        shared_project_id: str=None, shared_weight: float=1, shared_version: int=None
+    ):
+        """
+        Constructor.
+
+        :param version: the version number of the snapshot
+        :param person_ids: the set of person IDs
+        :param group_sizes: the dictionary of group capacities
+        :param constraints: the constraints
+        :param history_index: the index of the past pairings
+        :param occurrences_maps: the occurrences maps prepared for the persons and groups (built lazily if None)
+        :param rotation_schedule: the combinatorial schedule whose first rounds are the whole history (if any)
+        :param rotation_round: the index of the next round of the schedule
+        :param approximation_width: the width of the approximate generation (exact generation if None)
+        :param partner_candidates: the candidate partners of the approximate generation
+        :param prioritize_groups: whether to avoid repeated person-group pairings
+        rather than repeated person-person pairings
+        :param shared_index: the index of the past pairings of all the projects sharing the roster (if any)
+        :param shared_project_id: the ID of the project in the shared index
+        :param shared_weight: the weight of the pairings of the other projects
+        :param shared_version: the version of the shared index the occurrences maps were prepared at
+        """
+        self.version = version
+        self.person_ids = person_ids
+        self.group_sizes = group_sizes
+        self.constraints = constraints
+        self.history_index = history_index
+        # the occurrences maps and the version of the shared index they were prepared at, cached together
+        self.prepared_maps = None if occurrences_maps is None else (occurrences_maps, shared_version)
+        self.rotation_schedule = rotation_schedule
+        self.rotation_round = rotation_round
+        self.approximation_width = approximation_width
+        self.partner_candidates = partner_candidates
+        self.prioritize_groups = prioritize_groups
+        self.shared_index = shared_index
+        self.shared_project_id = shared_project_id
+        self.shared_weight = shared_weight
+
+    def replace(self, **changes):
+        """
+        Get the next version of the snapshot, with some attributes changed.
+        The occurrences maps are dropped, unless they are passed with the version of the shared index
+        they were prepared at.
+
+        :param changes: the new values of the changed attributes
+        :return: the new snapshot
+        """
+        occurrences_maps = changes.pop('occurrences_maps', None)
+        shared_version = changes.pop('shared_version', None)
+        snapshot = copy.copy(self)
+        snapshot.__dict__.update(changes)
+        snapshot.prepared_maps = None if occurrences_maps is None else (occurrences_maps, shared_version)
+        snapshot.version = self.version + 1
+        return snapshot
+
+    @property
+    def occurrences_maps(self):
+        return self.get_prepared_maps()[0]
+
+    def get_prepared_maps(self):
+        """
+        Get the occurrences maps cached so far, without preparing them.
+
+        :return: the 3 dictionaries and the version of the shared index they were prepared at, or (None, None)
+        """
+        prepared_maps = self.prepared_maps
+        return (None, None) if prepared_maps is None else prepared_maps
+
+    def get_occurrences_maps(self):
+        """
+        Get 3 maps containing respectively:
+        - the count, for each person, of past pairings with other persons,
+        - the count of occurrences of past person-person pairings,
+        - the count of occurrences of past person-group pairings.
+        The maps only contain the current persons and groups, they are prepared once per snapshot
+        and then carried over to the next versions by the writes.
+        With a shared index, they are prepared again after the saves of the other projects.
+
+        :return: the 3 dictionaries
+        """
+        occurrences_maps, shared_version = self.get_prepared_maps()
+        if not self.are_current_maps(occurrences_maps, shared_version):
+            shared_version = self.get_shared_version()
+            occurrences_maps = self.prepare_occurrences_maps()
+            # a single assignment, so that the readers see the maps and their version together
+            self.prepared_maps = (occurrences_maps, shared_version)
+        return occurrences_maps
+
+    def has_current_occurrences_maps(self):
+        """
+        Check if the occurrences maps are prepared and include the last pairings of the other projects.
+
+        :return: True if the maps can be used as they are, False otherwise
+        """
+        return self.are_current_maps(*self.get_prepared_maps())
+
+    def are_current_maps(self, occurrences_maps: tuple, shared_version: int):
+        """
+        Check if occurrences maps can be used as they are.
+
+        :param occurrences_maps: the 3 dictionaries (or None)
+        :param shared_version: the version of the shared index they were prepared at
+        :return: True if the maps are prepared and include the last pairings of the other projects, False otherwise
+        """
+        if occurrences_maps is None:
+            return False
+        return self.shared_index is None or shared_version == self.shared_index.version
+
+    def get_shared_version(self):
+        """
+        Get the current version of the shared index.
+
+        :return: the version, or None if there is no shared index
+        """
+        return None if self.shared_index is None else self.shared_index.version
+
+    def get_pairing_index(self):
+        """
+        Get the index from which the past pairings are read: the history index,
+        combined with the pairings of the other projects if the index is shared.
+
+        :return: the history index or the combined view
+        """
+        return CombinedHistoryIndex.combine(
+            self.history_index, self.shared_index, self.shared_project_id, self.shared_weight
+        )
+
+    def prepare_occurrences_maps(self):
+        """
+        Build the 3 occurrences maps from the history index.
+
+        :return: the 3 layered dictionaries
+        """
+        pairing_counts_map = {}
+        person_occurrences_map = {}
+        group_occurrences_map = {}
+        pairing_index = self.get_pairing_index()
+        person_ids = list(self.person_ids)
+        for idx, person1_id in enumerate(person_ids):
+            pairing_counts_map[person1_id] = pairing_index.get_pairing_count(person1_id)
+            for person2_id in person_ids[idx + 1:]:
+                self.add_person_occurrence(person_occurrences_map, person1_id, person2_id, pairing_index)
+            for group_id in self.group_sizes:
+                self.add_group_occurrence(group_occurrences_map, person1_id, group_id)
+        # layered, so that the writes carry the maps over to the next versions without copying them
+        return LayeredDict(pairing_counts_map), LayeredDict(person_occurrences_map), LayeredDict(group_occurrences_map)
+
+    def add_person_occurrence(
+        self, person_occurrences_map: dict, person1_id: str, person2_id: str, pairing_index=None
+    ):
+        if pairing_index is None:
+            pairing_index = self.get_pairing_index()
+        key = get_person_person_key(person1_id, person2_id)
+        person_occurrences_map[key] = {
+            'person1Id': person1_id,
+            'person2Id': person2_id,
+            'count': pairing_index.get_person_count(person1_id, person2_id)
+        }
+
+    def add_group_occurrence(self, group_occurrences_map: dict, person_id: str, group_id: str):
+        key = get_person_group_key(person_id, group_id)
+        group_occurrences_map[key] = {
+            'personId': person_id,
+            'groupId': group_id,
+            'count': self.history_index.get_group_count(person_id, group_id)
+        }
+
+    def generate_entry(self, compact: bool=False):
+        """
+        Generate a new possible entry that satisfies the constraints
+        and minimizes the redundancy of past pairings.
+
+        :param compact: whether to return a compact entry instead of a dictionary of sets
+        :return: a new entry
+        """
+        # the optional engines are only imported when used, to keep the start of the greedy path fast
+        if self.prioritize_groups:
+            from .assignment_entry_generator import AssignmentEntryGenerator
+            generator = AssignmentEntryGenerator(
+                person_ids=self.person_ids, group_sizes=self.group_sizes,
+                group_occurrences_map=self.get_occurrences_maps()[2], constraints=self.constraints
+            )
+            entry = generator.generate_entry()
+            return CompactEntry.from_entry(entry) if compact else entry
+        if self.can_use_rotation_schedule():
+            entry = self.rotation_schedule.get_entry(self.rotation_round)
+            return CompactEntry.from_entry(entry) if compact else entry
+        if self.approximation_width is not None:
+            from .approximate_entry_generator import ApproximateEntryGenerator
+            generator = ApproximateEntryGenerator(
+                person_ids=self.person_ids, group_sizes=self.group_sizes,
+                history_index=self.get_pairing_index(), partner_candidates=self.partner_candidates,
+                constraints=self.constraints, width=self.approximation_width
+            )
+            return generator.generate_entry(compact)
+        pairing_counts_map, person_occurrences_map, group_occurrences_map = self.get_occurrences_maps()
+        generator = EntryGenerator(
+            person_ids=self.person_ids, group_sizes=self.group_sizes,
+            pairing_counts_map=pairing_counts_map,
+            person_occurrences_map=person_occurrences_map,
+            group_occurrences_map=group_occurrences_map,
+            constraints=self.constraints
+        )
+        return generator.generate_entry(compact)
+
+    def can_use_rotation_schedule(self):
+        """
+        Check if the next entry can be taken from the rotation schedule, i.e. if the history
+        only contains the previous rounds of the schedule and the schedule has rounds left
+        without repeated pairings.
+
+        :return: True if the rotation schedule can be used, False otherwise
+        """
+        return self.rotation_schedule is not None and self.rotation_round < self.rotation_schedule.round_count
+
+    def needs_occurrences_maps(self):
+        """
+        Check if the generation of the next entry reads the occurrences maps,
+        i.e. if it is not taken from the rotation schedule or generated approximately.
+
+        :return: True if the occurrences maps are needed, False otherwise
+        """
+        if self.prioritize_groups:
+            return True
+        return not self.can_use_rotation_schedule() and self.approximation_width is None
+
+    def generate_best_entry(self, attempts: int, compact: bool=False):
+        """
+        Generate several possible entries and keep the one with the lowest redundancy.
+        The attempts stop early if an entry reaches the redundancy lower bound.
+
+        :param attempts: the number of entries to generate
+        :param compact: whether to return a compact entry instead of a dictionary of sets
+        :return: the best entry
+        """
+        lower_bound = self.get_redundancy_lower_bound()
+        best_entry = None
+        best_redundancy = None
+        for _ in range(attempts):
+            entry = self.generate_entry(compact)
+            redundancy = self.get_entry_redundancy(entry)
+            if best_entry is None or redundancy < best_redundancy:
+                best_entry = entry
+                best_redundancy = redundancy
+            # no entry can do better
+            if best_redundancy <= lower_bound:
+                break
+        return best_entry
+
+    def repair_entry(self, entry: dict, added: set=None, removed: set=None):
+        """
+        Repair a previously announced entry after last-minute roster changes:
+        the newcomers are placed, the holes are backfilled and the groups are rebalanced
+        under the constraints, only touching the affected groups and moving as few persons as possible.
+
+        :param entry: the announced entry
+        :param added: the set of IDs of the persons to add
+        :param removed: the set of IDs of the persons to remove
+        :return: the repaired entry
+        """
+        from .entry_repairer import EntryRepairer
+        repairer = EntryRepairer(
+            group_sizes=self.group_sizes, history_index=self.get_pairing_index(),
+            constraints=self.constraints, entry=entry
+        )
+        return repairer.repair_entry(added_person_ids=added or set(), removed_person_ids=removed or set())
+
+    def get_entry_redundancy(self, entry: dict):
+        """
+        Get the redundancy of an entry, i.e. the number of past occurrences
+        of all the person-person pairings it contains.
+
+        :param entry: the entry to score
+        :return: the redundancy of the entry
+        """
+        pairing_index = self.get_pairing_index()
+        redundancy = 0
+        _, member_ids, group_offsets = CompactEntry.get_entry_members(entry)
+        for start, end in zip(group_offsets, group_offsets[1:]):
+            group = [person_id for person_id in member_ids[start:end] if person_id in self.person_ids]
+            for idx, person1_id in enumerate(group):
+                for person2_id in group[idx + 1:]:
+                    redundancy += pairing_index.get_person_count(person1_id, person2_id)
+        return redundancy
+
+    def get_redundancy_lower_bound(self):
+        """
+        Get a lower bound on the redundancy of any entry satisfying the 'together' constraints
+        for the persons, groups and history of the snapshot.
+
+        :return: the lower bound
+        """
+        from .lower_bound import get_redundancy_lower_bound
+        return get_redundancy_lower_bound(
+            person_ids=self.person_ids, group_sizes=self.group_sizes,
+            history_index=self.get_pairing_index(), constraints=self.constraints
+        )
+
+    def get_optimality_gap(self, entry: dict):
+        """
+        Get the gap between the redundancy of an entry and the redundancy lower bound.
+        A null gap proves that the entry is optimal.
+
+        :param entry: the entry to score
+        :return: the optimality gap
+        """
+        return self.get_entry_redundancy(entry) - self.get_redundancy_lower_bound()
@@ -1,6 +1,6 @@
 import pprint
 
-from memomix import MemoMix
+from .memomix import MemoMix
 
 # taches de ménage, person: name, capacity
 
@@ -58,9 +58,13 @@ constraints = [
 
 if __name__ == '__main__':
     mm = MemoMix(persons=persons, group_sizes=groups_sizes, history=history, constraints=constraints)
+    rotation_mm = MemoMix(
+        persons=persons, group_sizes=groups_sizes, history=history, constraints=constraints, prioritize_groups=True
+    )
     bugs_mandatory_group = 0
     bugs_forbidden_groups = 0
     bugs_apart = 0
+    bugs_compact_groups = 0
     loops = 1000
     
     for i in range(loops):
@@ -72,10 +76,28 @@ if __name__ == '__main__':
                 bugs_forbidden_groups += 1
             if 'Arnaud' in persons and 'Théophane' in persons:
                 bugs_apart += 1
+        # the groups of a compact entry behave like sets
+        compact_entry = mm.generate_entry(compact=True)
+        for group_id, persons in compact_entry.items():
+            group = compact_entry[group_id]
+            if group - {'Timothé'} != set(persons) - {'Timothé'} \
+                    or group | {'Jean'} != set(persons) | {'Jean'} \
+                    or group & {'Jean', 'Cyril'} != set(persons) & {'Jean', 'Cyril'}:
+                bugs_compact_groups += 1
     print('For', loops, 'tests:')
     print('Bugs mandatory groups:', bugs_mandatory_group)
     print('Bugs forbidden groups:', bugs_forbidden_groups)
     print('Bugs apart:', bugs_apart)
+    print('Bugs compact groups:', bugs_compact_groups)
+
+    # the assignment mode for rotations satisfies the same constraints
+    bugs_rotation_constraints = 0
+    for i in range(loops // 10):
+        entry = rotation_mm.generate_entry()
+        if not {'Timothé', 'François'} <= entry['g1'] or 'Cyril' in entry['g3'] \
+                or any({'Arnaud', 'Théophane'} <= group for group in entry.values()):
+            bugs_rotation_constraints += 1
+    print('Bugs rotation constraints:', bugs_rotation_constraints)
     
     # entry = mm.generate_entry()
     # pprint.pp(entry)
@@ -29,3 +29,29 @@ def random_shuffle(iter):
 def random_choice(iter):
     return random.choice(list(iter))
 
+
+def get_bitset(indices):
+    """
+    Get the bitset (as a big integer) containing the given indices.
+
+    :param indices: the iterable of indices
+    :return: the bitset
+    """
+    bitset = 0
+    for index in indices:
+        bitset |= 1 << index
+    return bitset
+
+def get_bit_indices(bitset: int):
+    """
+    Get the indices contained in a bitset, in increasing order.
+
+    :param bitset: the bitset
+    :return: the list of indices
+    """
+    indices = []
+    while bitset:
+        lowest_bit = bitset & -bitset
+        indices.append(lowest_bit.bit_length() - 1)
+        bitset ^= lowest_bit
+    return indices